@@ -6,13 +6,41 @@
 
 * :class:`.RabinKarpCDC`: Rabin-Karp-based content-defined chunking strategy.
 
+* :class:`.AsymmetricExtremumCDC`: Content-defined chunking strategy based on local maxima (AE).
+
+* :class:`.RapidAsymmetricMaximumCDC`: Content-defined chunking strategy based on local byte maxima (RAM).
+
+* :class:`.ChunkerGroup`: Chunking with several independent configurations in a single pass over the content.
+
 See below for details.
 """
 import abc
-import fastchunking._rabinkarprh as _rabinkarprh
+import array
+import errno
+import io
+import os
+
+try:
+    import fastchunking._rabinkarprh as _rabinkarprh
+except ImportError:
+    # C++ extension is not available, fall back to the (slower) NumPy implementation
+    import fastchunking._rabinkarpnp as _rabinkarprh
 
 __version__ = '0.0.4'
 
+# block size used when reading files
+_FILE_BLOCK_SIZE = 1024 * 1024
+
+# block size in which content is passed to all chunkers of a chunker group, small enough to remain in the CPU cache
+_GROUP_BLOCK_SIZE = 64 * 1024
+
+# default maximum size of delimiter-aligned chunks divided by their expected chunk size
+_DELIMITED_MAX_CHUNK_SIZE_FACTOR = 8
+
+# expected chunk size of AE divided by its window size for random content (determined empirically, which is slightly
+# more than the approximation e - 1 by Zhang et al.)
+_AE_CHUNK_SIZE_FACTOR = 1.78
+
 
 class BaseChunkingStrategy(abc.ABC):
     """Abstract base class for chunking strategies."""
@@ -64,6 +92,132 @@ class BaseChunker(abc.ABC):
             iterable: An iterable yielding chunk boundary positions relative to `buf`.
         """
 
+    def find_next_boundary(self, buf, start=0, limit=None):
+        """Finds the next chunk boundary within `buf[start:limit]`.
+
+        In contrast to :meth:`.next_chunk_boundaries`, only the content up to (and including) the first chunk boundary
+        is consumed, i.e., the chunker is left positioned right after the returned boundary. This allows to chunk data
+        lazily, e.g., by repeatedly calling this function with `start` set to the previously returned boundary.
+
+        Chunkers should override this function, as the default implementation passes the content to
+        :meth:`.next_chunk_boundaries` byte by byte, which is slow.
+
+        Note:
+            Calls of this function and of :meth:`.next_chunk_boundaries` may be mixed arbitrarily: The chunking
+            algorithm is applied to the concatenation of all consumed content.
+
+        Args:
+            buf (bytes): The message that is to be chunked.
+            start (Optional[int]): Position within `buf` at which chunking is continued.
+            limit (Optional[int]): Position within `buf` at which chunking stops, defaults to the end of `buf`.
+
+        Returns:
+            Optional[int]: The position of the next chunk boundary relative to `buf`, or None if `buf[start:limit]`
+                does not contain a chunk boundary, in which case it has been consumed entirely.
+        """
+        start, limit, _ = slice(start, limit).indices(len(buf))
+        buf = memoryview(buf)
+        for position in range(start, limit):
+            chunk_boundaries = list(self.next_chunk_boundaries(buf[position:position + 1]))
+            if chunk_boundaries:
+                return position + chunk_boundaries[0]
+        return None
+
+    def next_chunk_boundaries_file(self, file, block_size=_FILE_BLOCK_SIZE):
+        """Computes the next chunk boundaries within the content of a file.
+
+        Equivalent to :meth:`.next_chunk_boundaries` applied to the content of `file`, starting at its current
+        position, but content is read block-wise. On platforms supporting `SEEK_DATA` and `SEEK_HOLE`, holes of sparse
+        files are skipped without being read.
+
+        Args:
+            file: Path of the file, or a binary file object.
+            block_size (Optional[int]): Size of the blocks in which the file is read.
+
+        Returns:
+            list: List of chunk boundary positions relative to the start of the file content.
+        """
+        if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+            with open(file, 'rb', buffering=0) as file_:
+                return self.next_chunk_boundaries_file(file_, block_size)
+
+        chunk_boundaries = []
+        offset = 0
+        for segment in _read_file_segments(file, block_size):
+            if isinstance(segment, int):
+                segment_chunk_boundaries = self._next_chunk_boundaries_zeros(segment)
+                segment_length = segment
+            else:
+                segment_chunk_boundaries = self.next_chunk_boundaries(segment)
+                segment_length = len(segment)
+            chunk_boundaries.extend(offset + boundary for boundary in segment_chunk_boundaries)
+            offset += segment_length
+        return chunk_boundaries
+
+    def _next_chunk_boundaries_zeros(self, count):
+        """Computes the next chunk boundaries within a message consisting of `count` zero bytes.
+
+        Chunkers should override this function if zero bytes can be processed without materializing them.
+        """
+        zeros = bytes(min(count, _FILE_BLOCK_SIZE))
+        chunk_boundaries = []
+        for offset in range(0, count, len(zeros)):
+            segment = memoryview(zeros)[:count - offset]
+            chunk_boundaries.extend(offset + boundary for boundary in self.next_chunk_boundaries(segment))
+        return chunk_boundaries
+
+
+def _read_file_segments(file, block_size):
+    """Reads the content of a binary file object, starting at its current position, in blocks of `block_size` bytes.
+
+    On platforms supporting `SEEK_DATA` and `SEEK_HOLE`, holes of sparse files are not read but reported by their
+    length. File-like objects not backed by an OS file (e.g., `io.BytesIO`) are read entirely.
+
+    Yields:
+        Either a memoryview containing read data, which is only valid until the next segment is requested, or an int
+        denoting the length of a hole, i.e., of a range of zero bytes.
+    """
+    buf = memoryview(bytearray(block_size))
+
+    seekable = file.seekable()
+    position = file.tell() if seekable else 0
+    end = file.seek(0, os.SEEK_END) if seekable and hasattr(os, 'SEEK_HOLE') and _has_fileno(file) else None
+    while end is None or position < end:
+        # determine the next data range, if possible; otherwise, the remaining file is read
+        data_end = None
+        if end is not None:
+            try:
+                data_start = file.seek(position, os.SEEK_DATA)
+                data_end = file.seek(data_start, os.SEEK_HOLE)
+            except (OSError, ValueError, io.UnsupportedOperation) as e:
+                if isinstance(e, OSError) and e.errno == errno.ENXIO:
+                    # the file ends with a hole
+                    data_start = data_end = end
+                else:
+                    # the file system does not support holes
+                    data_start = position
+                    end = None
+            if data_start > position:
+                yield data_start - position
+            position = file.seek(data_start)
+
+        while data_end is None or position < data_end:
+            length = block_size if data_end is None else min(block_size, data_end - position)
+            read_length = file.readinto(buf[:length])
+            if not read_length:
+                return
+            yield buf[:read_length]
+            position += read_length
+
+
+def _has_fileno(file):
+    """Returns whether a file object is backed by an OS file, i.e., whether it has a working `fileno` method."""
+    try:
+        file.fileno()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return False
+    return True
+
 
 class BaseMultiLevelChunker(abc.ABC):
     """Abstract class specifying the interface of multi-level chunkers."""
@@ -98,6 +252,52 @@ class BaseMultiLevelChunker(abc.ABC):
             chunker index.
         """
 
+    def next_chunk_boundaries_levels_file(self, file, block_size=_FILE_BLOCK_SIZE):
+        """Computes the next chunk boundaries within the content of a file, along with their levels.
+
+        Equivalent to :meth:`.next_chunk_boundaries_levels` applied to the content of `file`, starting at its current
+        position, but content is read block-wise, see :meth:`.BaseChunker.next_chunk_boundaries_file`.
+
+        Args:
+            file: Path of the file, or a binary file object.
+            block_size (Optional[int]): Size of the blocks in which the file is read.
+
+        Returns:
+            list: List of tuples (boundary, level), where boundary is a boundary position relative to the start of the
+                file content.
+        """
+        if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+            with open(file, 'rb', buffering=0) as file_:
+                return self.next_chunk_boundaries_levels_file(file_, block_size)
+
+        chunk_boundaries_with_levels = []
+        offset = 0
+        for segment in _read_file_segments(file, block_size):
+            if isinstance(segment, int):
+                segment_chunk_boundaries_with_levels = self._next_chunk_boundaries_levels_zeros(segment)
+                segment_length = segment
+            else:
+                segment_chunk_boundaries_with_levels = self.next_chunk_boundaries_levels(segment)
+                segment_length = len(segment)
+            chunk_boundaries_with_levels.extend((offset + boundary, level)
+                                                for boundary, level in segment_chunk_boundaries_with_levels)
+            offset += segment_length
+        return chunk_boundaries_with_levels
+
+    def _next_chunk_boundaries_levels_zeros(self, count):
+        """Computes the next chunk boundaries (along with their levels) within a message consisting of `count` zero
+        bytes.
+
+        Multi-level chunkers should override this function if zero bytes can be processed without materializing them.
+        """
+        zeros = bytes(min(count, _FILE_BLOCK_SIZE))
+        chunk_boundaries_with_levels = []
+        for offset in range(0, count, len(zeros)):
+            segment = memoryview(zeros)[:count - offset]
+            chunk_boundaries_with_levels.extend((offset + boundary, level)
+                                                for boundary, level in self.next_chunk_boundaries_levels(segment))
+        return chunk_boundaries_with_levels
+
 
 class DefaultMultiLevelChunker(BaseMultiLevelChunker):
     """Default multi-level chunker implementation, turning a standard chunker into a multi-level chunker.
@@ -167,13 +367,18 @@ class SC(BaseChunkingStrategy):
             self._next_chunk_boundary = self._chunk_size
 
         def next_chunk_boundaries(self, buf, prepend_bytes=0):
+            return self._next_chunk_boundaries_length(len(buf), prepend_bytes)
+
+        def _next_chunk_boundaries_zeros(self, count):
+            return self._next_chunk_boundaries_length(count)
+
+        def _next_chunk_boundaries_length(self, buf_length, prepend_bytes=0):
             # consider prepend_bytes
             self._next_chunk_boundary = ((self._next_chunk_boundary - prepend_bytes) % self._chunk_size)
             if self._next_chunk_boundary == 0:
                 self._next_chunk_boundary = self._chunk_size
 
             # determine chunk boundaries
-            buf_length = len(buf)
             chunk_boundaries = range(self._next_chunk_boundary, buf_length + 1, self._chunk_size)
 
             # update next chunk boundary position
@@ -183,32 +388,89 @@ class SC(BaseChunkingStrategy):
 
             return chunk_boundaries
 
+        def find_next_boundary(self, buf, start=0, limit=None):
+            start, limit, _ = slice(start, limit).indices(len(buf))
+            buf_length = max(limit - start, 0)
+
+            # no boundary within buf[start:limit]
+            if self._next_chunk_boundary > buf_length:
+                self._next_chunk_boundary -= buf_length
+                return None
+
+            chunk_boundary = start + self._next_chunk_boundary
+            self._next_chunk_boundary = self._chunk_size
+            return chunk_boundary
+
 
 class RabinKarpCDC(BaseChunkingStrategy):
     """Content-defined chunking strategy based on Rabin Karp.
 
     Generates variable-size chunks.
+
+    Optionally, chunk boundaries are aligned to a delimiter byte, e.g., to the line endings of logs, CSV or JSON-lines
+    data, so that chunks consist of complete records: Whenever the rolling hash value matches, the chunk ends after the
+    next occurrence of the delimiter (which may be the current byte), or once it reaches a maximum size.
     """
 
-    __slots__ = ('window_size', '_seed')
+    __slots__ = ('window_size', '_seed', '_delimiter', '_max_chunk_size')
 
-    def __init__(self, window_size, seed):
+    def __init__(self, window_size, seed, delimiter=None, max_chunk_size=None):
+        """
+        Args:
+            window_size (int): Size of the rolling hash window.
+            seed (int): Seed value affecting the pseudo-random distribution of chunk boundaries.
+            delimiter (Optional[bytes]): A single byte (e.g., ``b'\\n'``) to which chunk boundaries are aligned.
+            max_chunk_size (Optional[int]): Maximum size of delimiter-aligned chunks, defaults to
+                ``8 * chunk_size``.
+
+        Raises:
+            ValueError: If `delimiter` is not a single byte, or if `max_chunk_size` is specified without a delimiter.
+        """
         super(RabinKarpCDC, self).__init__()
+        if delimiter is not None and (not isinstance(delimiter, (bytes, bytearray)) or len(delimiter) != 1):
+            raise ValueError('delimiter has to be a single byte')
+        if max_chunk_size is not None and (delimiter is None or max_chunk_size < 1):
+            raise ValueError('maximum chunk size has to be positive and requires a delimiter')
         self.window_size = window_size
         self._seed = seed
+        self._delimiter = delimiter[0] if delimiter is not None else None
+        self._max_chunk_size = max_chunk_size
 
-    def create_chunker(self, chunk_size):
+    def create_chunker(self, chunk_size, super_features=0, features_per_super_feature=4):
         """Create a chunker performing content-defined chunking (CDC) using Rabin Karp's rolling hash scheme with a
         specific, expected chunk size.
 
+        Optionally, the chunker derives similarity sketches (super-features) for each chunk from the rolling hash
+        values computed during chunking. These are returned by its additional function
+        `next_chunk_boundaries_with_features(buf, prepend_bytes=0)`. Chunks sharing a super-feature are likely to be
+        similar, i.e., good candidates for delta compression. Such chunkers do not support
+        :meth:`.BaseChunker.find_next_boundary`, which raises a `TypeError`.
+
         Args:
             chunk_size (int): (Expected) target chunk size.
+            super_features (Optional[int]): Number of super-features per chunk.
+            features_per_super_feature (Optional[int]): Number of min-wise features combined into each super-feature.
 
         Returns:
             BaseChunker: A chunker object.
+
+        Raises:
+            ValueError: If `super_features` is negative, if `features_per_super_feature` is not positive, or if
+                super-features are requested for delimiter-aligned chunking.
         """
+        if super_features < 0 or features_per_super_feature < 1:
+            raise ValueError('numbers of super-features and of features per super-feature have to be positive')
         rolling_hash = _rabinkarprh.RabinKarpHash(self.window_size, self._seed)
         rolling_hash.set_threshold(1.0 / chunk_size)
+        if self._delimiter is not None:
+            if super_features:
+                raise ValueError('super-features are not supported for delimiter-aligned chunking')
+            rolling_hash.set_delimiter(self._delimiter, self._max_chunk_size or
+                                       _DELIMITED_MAX_CHUNK_SIZE_FACTOR * chunk_size)
+            return RabinKarpCDC._DelimitedChunker(rolling_hash)
+        if super_features:
+            rolling_hash.set_features(super_features, features_per_super_feature)
+            return RabinKarpCDC._FeatureChunker(rolling_hash, super_features)
         return RabinKarpCDC._Chunker(rolling_hash)
 
     def create_multilevel_chunker(self, chunk_sizes):
@@ -225,6 +487,9 @@ class RabinKarpCDC(BaseChunkingStrategy):
         Returns:
             BaseMultiLevelChunker: A multi-level chunker object.
         """
+        if self._delimiter is not None:
+            # delimiter-aligned chunkers are combined independently of each other
+            return super(RabinKarpCDC, self).create_multilevel_chunker(chunk_sizes)
         rolling_hash = _rabinkarprh.RabinKarpMultiThresholdHash(self.window_size, self._seed,
                                                                 [1.0 / chunk_size for chunk_size in chunk_sizes])
         return RabinKarpCDC._MultiLevelChunker(rolling_hash)
@@ -236,7 +501,61 @@ class RabinKarpCDC(BaseChunkingStrategy):
             self._rolling_hash = rolling_hash
 
         def next_chunk_boundaries(self, buf, prepend_bytes=0):
-            return self._rolling_hash.next_chunk_boundaries(bytes(buf), prepend_bytes)
+            return self._rolling_hash.next_chunk_boundaries(buf, prepend_bytes)
+
+        def _next_chunk_boundaries_zeros(self, count):
+            return self._rolling_hash.next_chunk_boundaries_zeros(count)
+
+        def find_next_boundary(self, buf, start=0, limit=None):
+            start, limit, _ = slice(start, limit).indices(len(buf))
+            chunk_boundary = self._rolling_hash.next_chunk_boundary(memoryview(buf)[start:limit])
+            return start + chunk_boundary if chunk_boundary != -1 else None
+
+    class _DelimitedChunker(_Chunker):
+        __slots__ = ()
+
+        # zero bytes are materialized, as the C++ extension does not process them without content in this mode
+        _next_chunk_boundaries_zeros = BaseChunker._next_chunk_boundaries_zeros
+
+    class _FeatureChunker(_Chunker):
+        __slots__ = ('_super_features',)
+
+        def __init__(self, rolling_hash, super_features):
+            super(RabinKarpCDC._FeatureChunker, self).__init__(rolling_hash)
+            self._super_features = super_features
+
+        def next_chunk_boundaries(self, buf, prepend_bytes=0):
+            return self.next_chunk_boundaries_with_features(buf, prepend_bytes)[0]
+
+        def next_chunk_boundaries_with_features(self, buf, prepend_bytes=0):
+            """Computes the next chunk boundaries within `buf`, along with the super-features of the chunks ending at
+            these boundaries.
+
+            Only content passed to this function (or to :meth:`.next_chunk_boundaries`) contributes to
+            super-features.
+
+            Args:
+                buf (bytes): The message that is to be chunked.
+                prepend_bytes (Optional[int]): Optional number of zero bytes that should be input to the chunking
+                    algorithm before `buf`.
+
+            Returns:
+                tuple: A tuple (boundaries, features), where boundaries is a list of chunk boundary positions relative
+                    to `buf` and features is an `array.array` of unsigned 32-bit integers containing the super-features
+                    of the i-th chunk at positions ``i * super_features`` to ``(i + 1) * super_features - 1``.
+            """
+            results = list(self._rolling_hash.next_chunk_boundaries_with_features(buf, prepend_bytes))
+            stride = self._super_features + 1
+            features = array.array('I', results)
+            del features[::stride]
+            return results[::stride], features
+
+        def find_next_boundary(self, buf, start=0, limit=None):
+            # the super-features of the chunk ending at the boundary could not be returned
+            raise TypeError('lazy chunking is not supported by chunkers computing super-features')
+
+        # holes are materialized, as only content contributes to super-features
+        _next_chunk_boundaries_zeros = BaseChunker._next_chunk_boundaries_zeros
 
     class _MultiLevelChunker(BaseMultiLevelChunker):
         __slots__ = ('_rolling_hash',)
@@ -245,5 +564,151 @@ class RabinKarpCDC(BaseChunkingStrategy):
             self._rolling_hash = rolling_hash
 
         def next_chunk_boundaries_levels(self, buf, prepend_bytes=0):
-            i = iter(self._rolling_hash.next_chunk_boundaries_with_thresholds(bytes(buf), prepend_bytes))
+            i = iter(self._rolling_hash.next_chunk_boundaries_with_thresholds(buf, prepend_bytes))
             return zip(i, i)
+
+
+class AsymmetricExtremumCDC(BaseChunkingStrategy):
+    """Content-defined chunking strategy based on the asymmetric extremum (AE) algorithm by Zhang et al. (INFOCOM 2015).
+
+    Generates variable-size chunks, but with considerably lower variance of chunk sizes than :class:`.RabinKarpCDC`.
+    A chunk ends a fixed number of bytes (the window size) after the first position that is a maximum among all
+    preceding positions of the chunk and the window size following positions. Values of positions are compared as
+    64-bit integers consisting of the 8 bytes ending at the respective position, i.e., no hash values are computed.
+    """
+
+    __slots__ = ()
+
+    def create_chunker(self, chunk_size):
+        """Create a chunker performing content-defined chunking (CDC) using the AE algorithm with a specific, expected
+        chunk size.
+
+        Args:
+            chunk_size (int): (Expected) target chunk size.
+
+        Returns:
+            BaseChunker: A chunker object.
+        """
+        window_size = max(1, round(chunk_size / _AE_CHUNK_SIZE_FACTOR))
+        return AsymmetricExtremumCDC._Chunker(_rabinkarprh.AsymmetricExtremum(window_size))
+
+    class _Chunker(BaseChunker):
+        __slots__ = ('_engine',)
+
+        def __init__(self, engine):
+            self._engine = engine
+
+        def next_chunk_boundaries(self, buf, prepend_bytes=0):
+            return self._engine.next_chunk_boundaries(buf, prepend_bytes)
+
+        def find_next_boundary(self, buf, start=0, limit=None):
+            start, limit, _ = slice(start, limit).indices(len(buf))
+            chunk_boundary = self._engine.next_chunk_boundary(memoryview(buf)[start:limit])
+            return start + chunk_boundary if chunk_boundary != -1 else None
+
+
+class RapidAsymmetricMaximumCDC(BaseChunkingStrategy):
+    """Content-defined chunking strategy based on the rapid asymmetric maximum (RAM) algorithm by Widodo et al. (2017).
+
+    Generates variable-size chunks, but with considerably lower variance of chunk sizes than :class:`.RabinKarpCDC`.
+    The maximum byte value within a fixed-size window at the beginning of a chunk is determined, and the chunk ends at
+    the first subsequent byte whose value is at least this maximum, i.e., no hash values are computed. Chunks are never
+    smaller than the window size.
+    """
+
+    __slots__ = ()
+
+    def create_chunker(self, chunk_size):
+        """Create a chunker performing content-defined chunking (CDC) using the RAM algorithm with a specific, expected
+        chunk size.
+
+        Args:
+            chunk_size (int): (Expected) target chunk size.
+
+        Returns:
+            BaseChunker: A chunker object.
+        """
+        # smallest window size whose expected chunk size is not less than chunk_size
+        low, high = 1, max(1, chunk_size)
+        while low < high:
+            middle = (low + high) // 2
+            if _ram_expected_chunk_size(middle) < chunk_size:
+                low = middle + 1
+            else:
+                high = middle
+        return RapidAsymmetricMaximumCDC._Chunker(_rabinkarprh.RapidAsymmetricMaximum(low))
+
+    # chunkers of both strategies only differ by their engine
+    _Chunker = AsymmetricExtremumCDC._Chunker
+
+
+def _ram_expected_chunk_size(window_size):
+    """Computes the expected size of chunks generated by RAM with a specific window size for random content."""
+    # if the maximum byte value within the window is m, the first subsequent byte not less than m follows after
+    # 256 / (256 - m) bytes on average
+    return window_size + sum((((m + 1) / 256) ** window_size - (m / 256) ** window_size) * 256 / (256 - m)
+                             for m in range(256))
+
+
+class ChunkerGroup(object):
+    """Performs chunking with several independent configurations (chunking strategies and chunk sizes) at once.
+
+    Unlike a multi-level chunker, which combines chunkers of a single strategy with different chunk sizes into one
+    sequence of boundaries, a chunker group returns separate chunk boundaries for each configuration, e.g., to compare
+    the deduplication efficiency of different configurations on the same data. Content is passed to all chunkers in
+    small blocks, so that each block is loaded from memory only once. If all configurations use
+    :class:`.RabinKarpCDC` without a delimiter, the whole process is performed by the C++ extension.
+    """
+
+    __slots__ = ('_count', '_rolling_hash_group', '_chunkers')
+
+    def __init__(self, configurations):
+        """Creates a chunker group.
+
+        Args:
+            configurations (list): List of tuples (chunking_strategy, chunk_size), where chunking_strategy is a
+                :class:`.BaseChunkingStrategy` and chunk_size is the respective (expected) target chunk size.
+        """
+        configurations = list(configurations)
+        self._count = len(configurations)
+        self._rolling_hash_group = None
+        self._chunkers = None
+        if all(isinstance(chunking_strategy, RabinKarpCDC) and chunking_strategy._delimiter is None
+               for chunking_strategy, _ in configurations):
+            self._rolling_hash_group = _rabinkarprh.RabinKarpHashGroup(
+                [chunking_strategy.window_size for chunking_strategy, _ in configurations],
+                [chunking_strategy._seed for chunking_strategy, _ in configurations],
+                [1.0 / chunk_size for _, chunk_size in configurations])
+        else:
+            self._chunkers = [chunking_strategy.create_chunker(chunk_size)
+                              for chunking_strategy, chunk_size in configurations]
+
+    def next_chunk_boundaries(self, buf, prepend_bytes=0):
+        """Computes the next chunk boundaries within `buf` for each configuration.
+
+        See :meth:`.BaseChunker.next_chunk_boundaries`.
+
+        Args:
+            buf (bytes): The message that is to be chunked.
+            prepend_bytes (Optional[int]): Optional number of zero bytes that should be input to the chunking algorithms
+                before `buf`.
+
+        Returns:
+            list: List containing a list of chunk boundary positions relative to `buf` for each configuration, in the
+                order the configurations were specified during instantiation.
+        """
+        chunk_boundaries = [[] for _ in range(self._count)]
+        if self._rolling_hash_group is not None:
+            i = iter(self._rolling_hash_group.next_chunk_boundaries(buf, prepend_bytes))
+            for boundary, index in zip(i, i):
+                chunk_boundaries[index].append(boundary)
+            return chunk_boundaries
+
+        buf = memoryview(buf).cast('B')
+        for offset in range(0, max(len(buf), 1), _GROUP_BLOCK_SIZE):
+            block = buf[offset:offset + _GROUP_BLOCK_SIZE]
+            block_prepend_bytes = prepend_bytes if offset == 0 else 0
+            for chunker, boundaries in zip(self._chunkers, chunk_boundaries):
+                boundaries.extend(offset + boundary
+                                  for boundary in chunker.next_chunk_boundaries(block, block_prepend_bytes))
+        return chunk_boundaries
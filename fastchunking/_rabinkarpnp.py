@@ -0,0 +1,627 @@
+"""NumPy implementation of the chunking engines, in particular of the Rabin-Karp rolling hash.
+
+Provides the same classes and functions as the C++ extension module `fastchunking._rabinkarprh` and computes identical
+chunk boundaries (and super-features). It is used automatically if the extension module is not available.
+
+Instead of consuming content byte by byte, rolling hash values are computed for whole blocks of content at once: With
+`h[i]` denoting the character hash of the i-th byte, the hash value of the window ending at position `e` is
+
+    H[e] = sum(B^k * h[e - k] for k in range(window_size)) = B^e * (Q[e] - Q[e - window_size]),
+
+where `Q` is the prefix sum of `h[i] * B^(-i)`. As `B` is odd, it is invertible modulo 2^32, so all computations are
+performed using vectorized (wrapping) unsigned 32-bit arithmetic, of which the lower 29 bits are the hash values.
+"""
+import random
+
+import numpy
+
+_WORDSIZE = 29  # compute 29-bit integer hashes
+_HASHMASK = (1 << _WORDSIZE) - 1
+_B = 37
+# multiplicative inverse of B modulo 2^32
+_B_INVERSE = 0x914C1BAD
+
+_FEATURE_SAMPLING_MASK = 15  # sample one out of 16 hash values on average
+
+# maximum number of bytes whose hash values are computed at once, which bounds memory consumption
+_SEGMENT_SIZE = 1024 * 1024
+
+# powers of B and of its multiplicative inverse modulo 2^32, extended as needed
+_powers = numpy.ones(1, dtype=numpy.uint32)
+_inverse_powers = numpy.ones(1, dtype=numpy.uint32)
+
+
+def _mersenne_twister(seed):
+    """Returns a Mersenne Twister generator equivalent to `MTRand(seed)` of the C++ extension, whose 32-bit random
+    numbers are obtained using `getrandbits(32)`."""
+    state = [seed & 0xFFFFFFFF]
+    for i in range(1, 624):
+        state.append((1812433253 * (state[-1] ^ (state[-1] >> 30)) + i) & 0xFFFFFFFF)
+    generator = random.Random()
+    generator.setstate((3, tuple(state) + (624,), None))
+    return generator
+
+
+def _get_powers(length):
+    """Returns the first `length` powers of B and of its inverse, modulo 2^32."""
+    global _powers, _inverse_powers
+    if len(_powers) < length:
+        size = max(length, 2 * len(_powers))
+        _powers = numpy.ones(size, dtype=numpy.uint32)
+        numpy.cumprod(numpy.full(size - 1, _B, dtype=numpy.uint32), dtype=numpy.uint32, out=_powers[1:])
+        _inverse_powers = numpy.ones(size, dtype=numpy.uint32)
+        numpy.cumprod(numpy.full(size - 1, _B_INVERSE, dtype=numpy.uint32), dtype=numpy.uint32, out=_inverse_powers[1:])
+    return _powers[:length], _inverse_powers[:length]
+
+
+def _segments(content):
+    """Splits content (any object supporting the buffer protocol) into uint8 arrays of at most `_SEGMENT_SIZE` bytes,
+    yielding each along with its offset."""
+    content = numpy.frombuffer(content, dtype=numpy.uint8)
+    for offset in range(0, len(content), _SEGMENT_SIZE):
+        yield offset, content[offset:offset + _SEGMENT_SIZE]
+
+
+class _RabinKarp(object):
+    """Implementation of the Rabin-Karp hash function (see `RabinKarp` of the C++ extension).
+
+    The state of a rolling hash is its window, i.e., the last (up to) `window_size` consumed bytes, which are stored
+    as `bytes`. Its hash value is derived from the window when needed.
+    """
+
+    def __init__(self, window_size, seed):
+        self._window_size = window_size
+
+        generator = _mersenne_twister(seed)
+        self._hashvalues = numpy.array([generator.getrandbits(32) & _HASHMASK for _ in range(256)],
+                                       dtype=numpy.uint32)
+        self._hashvalues_list = self._hashvalues.tolist()
+        self._b_to_n = pow(_B, window_size, 1 << _WORDSIZE)
+
+    def _hash_values(self, window, content):
+        """Computes the hash values at each position of content (a uint8 array) when consumed after window.
+
+        Returns:
+            tuple: A tuple (hashvalues, first_full), where hashvalues is a uint32 array and first_full is the first
+                position at which the rolling hash window is filled completely.
+        """
+        window_length = len(window)
+        length = window_length + len(content)
+        values = numpy.empty(length, dtype=numpy.uint32)
+        values[:window_length] = self._hashvalues[numpy.frombuffer(window, dtype=numpy.uint8)]
+        numpy.take(self._hashvalues, content, out=values[window_length:])
+
+        powers, inverse_powers = _get_powers(length)
+        prefix_sums = numpy.cumsum(values * inverse_powers, dtype=numpy.uint32)
+        prefix_sums[self._window_size:] -= prefix_sums[:-self._window_size]
+        prefix_sums *= powers
+        prefix_sums &= numpy.uint32(_HASHMASK)
+        return prefix_sums[window_length:], max(0, self._window_size - 1 - window_length)
+
+    def _hash_value(self, window):
+        """Computes the hash value of a single window."""
+        hashvalue = 0
+        for b in window:
+            hashvalue = (_B * hashvalue + self._hashvalues_list[b]) & _HASHMASK
+        return hashvalue
+
+    def _roll(self, window, content):
+        """Returns the window after consuming content."""
+        return (window + bytes(content[-self._window_size:]))[-self._window_size:]
+
+    @staticmethod
+    def _compute_threshold(threshold):
+        return int(threshold * (_HASHMASK + 1))
+
+
+class RabinKarpHash(_RabinKarp):
+    """High-level interface that performs chunking based on the Rabin-Karp rolling hash scheme."""
+
+    def __init__(self, window_size, seed):
+        super(RabinKarpHash, self).__init__(window_size, seed)
+        self._seed = seed
+        self._window = b''
+        self._threshold = 0
+        self._super_feature_count = 0
+        self._features_per_super_feature = 0
+        self._feature_multipliers = None
+        self._feature_increments = None
+        self._features = None
+        self._delimiter = None
+        self._max_chunk_size = 0
+        self._chunk_length = 0
+        self._delimiter_pending = False
+
+    def set_features(self, super_feature_count, features_per_super_feature):
+        self._super_feature_count = super_feature_count
+        self._features_per_super_feature = features_per_super_feature
+
+        generator = _mersenne_twister(self._seed ^ 0x5BD1E995)
+        feature_count = super_feature_count * features_per_super_feature
+        multipliers, increments = [], []
+        for _ in range(feature_count):
+            multipliers.append(generator.getrandbits(32) | 1)  # odd multipliers yield permutations of hash values
+            increments.append(generator.getrandbits(32))
+        self._feature_multipliers = numpy.array(multipliers, dtype=numpy.uint32)[:, numpy.newaxis]
+        self._feature_increments = numpy.array(increments, dtype=numpy.uint32)[:, numpy.newaxis]
+        self._features = numpy.full(feature_count, 0xFFFFFFFF, dtype=numpy.uint32)
+
+    def set_threshold(self, threshold):
+        self._threshold = self._compute_threshold(threshold)
+
+    def set_delimiter(self, delimiter, max_chunk_size):
+        self._delimiter = delimiter
+        self._max_chunk_size = max_chunk_size
+        self._chunk_length = 0
+        self._delimiter_pending = False
+
+    def next_chunk_boundaries(self, content, prepend_bytes):
+        self._prepend_zeros(prepend_bytes)
+        results = []
+        if self._delimiter is not None:
+            for offset, segment in _segments(content):
+                results.extend(offset + boundary for boundary in self._next_delimited_chunk_boundaries(segment))
+            return results
+
+        for offset, segment in _segments(content):
+            hashvalues, first_full = self._hash_values(self._window, segment)
+            boundaries = numpy.flatnonzero(hashvalues[first_full:] < self._threshold)
+            results.extend((boundaries + (offset + first_full + 1)).tolist())
+            self._window = self._roll(self._window, segment)
+        return results
+
+    def next_chunk_boundaries_zeros(self, count):
+        # after window_size zero bytes, further zero bytes do not change the state anymore
+        results = self.next_chunk_boundaries(bytes(min(count, self._window_size)), 0)
+        if count > self._window_size and self._hash_value(self._window) < self._threshold:
+            results.extend(range(self._window_size + 1, count + 1))
+        return results
+
+    def next_chunk_boundaries_with_features(self, content, prepend_bytes):
+        self._prepend_zeros(prepend_bytes)
+        results = []
+        for offset, segment in _segments(content):
+            hashvalues, first_full = self._hash_values(self._window, segment)
+            self._window = self._roll(self._window, segment)
+            hashvalues = hashvalues[first_full:]
+
+            # features are computed from a content-defined sample of hash values, including those at chunk boundaries
+            is_boundary = hashvalues < self._threshold
+            samples = numpy.flatnonzero(is_boundary | ((hashvalues & _FEATURE_SAMPLING_MASK) == 0))
+            if not len(samples):
+                continue
+            boundaries = numpy.flatnonzero(is_boundary)
+            sample_values = hashvalues[samples] * self._feature_multipliers + self._feature_increments
+
+            # minimum of the sampled values of each chunk (and of the rest of the segment following the last chunk)
+            sample_boundaries = numpy.searchsorted(samples, boundaries)
+            starts = numpy.concatenate(([0], sample_boundaries + 1))
+            if starts[-1] == len(samples):
+                starts = starts[:-1]
+            features = numpy.minimum.reduceat(sample_values, starts, axis=1)
+            features[:, 0] = numpy.minimum(features[:, 0], self._features)
+
+            if len(starts) > len(boundaries):
+                self._features = features[:, -1].copy()
+                features = features[:, :-1]
+            else:
+                self._features.fill(0xFFFFFFFF)
+            if not len(boundaries):
+                continue
+
+            # combine features using FNV-1a
+            features = features.reshape(self._super_feature_count, self._features_per_super_feature, -1)
+            super_features = numpy.full((self._super_feature_count, len(boundaries)), 2166136261, dtype=numpy.uint32)
+            for l in range(self._features_per_super_feature):
+                super_features ^= features[:, l, :]
+                super_features *= numpy.uint32(16777619)
+
+            output = numpy.empty((len(boundaries), self._super_feature_count + 1), dtype=numpy.int64)
+            output[:, 0] = boundaries + (offset + first_full + 1)
+            output[:, 1:] = super_features.T
+            results.extend(output.ravel().tolist())
+        return results
+
+    def next_chunk_boundary(self, content):
+        # examine content in increasingly large pieces, as to not hash much content following the first boundary
+        content = numpy.frombuffer(content, dtype=numpy.uint8)
+        offset, piece_size = 0, 4096
+        while offset < len(content):
+            piece = content[offset:offset + piece_size]
+            if self._delimiter is not None:
+                boundaries = self._next_delimited_chunk_boundaries(piece, first_only=True)
+                if boundaries:
+                    return offset + boundaries[0]
+                offset += len(piece)
+                piece_size = min(2 * piece_size, _SEGMENT_SIZE)
+                continue
+
+            hashvalues, first_full = self._hash_values(self._window, piece)
+            boundaries = numpy.flatnonzero(hashvalues[first_full:] < self._threshold)
+            if len(boundaries):
+                piece = piece[:first_full + boundaries[0] + 1]
+                self._window = self._roll(self._window, piece)
+                return offset + len(piece)
+            self._window = self._roll(self._window, piece)
+            offset += len(piece)
+            piece_size = min(2 * piece_size, _SEGMENT_SIZE)
+        return -1
+
+    def _next_delimited_chunk_boundaries(self, segment, first_only=False):
+        """Consumes a segment of content in delimiter-aligned mode (see `set_delimiter` of the C++ extension), or only
+        its content up to the first chunk boundary if `first_only` is set, and returns the chunk boundaries."""
+        hashvalues, first_full = self._hash_values(self._window, segment)
+        candidates = numpy.flatnonzero(hashvalues[first_full:] < self._threshold) + first_full
+        delimiters = numpy.flatnonzero(segment == self._delimiter)
+
+        boundaries = []
+        position, length = 0, len(segment)
+        while position < length and not (first_only and boundaries):
+            # the position at which the chunk reaches the maximum chunk size (or the end of the segment)
+            limit = min(length, position + self._max_chunk_size - self._chunk_length)
+
+            if not self._delimiter_pending:
+                index = candidates.searchsorted(position)
+                if index < len(candidates) and candidates[index] < limit:
+                    # the hash value matches, so the chunk ends at the next delimiter, starting with this position
+                    candidate = int(candidates[index])
+                    self._chunk_length += candidate - position
+                    position = candidate
+                    self._delimiter_pending = True
+                    continue
+                end, found = limit, False
+            else:
+                index = delimiters.searchsorted(position)
+                found = index < len(delimiters) and delimiters[index] < limit
+                end = int(delimiters[index]) + 1 if found else limit
+
+            self._chunk_length += end - position
+            position = end
+            if found or self._chunk_length == self._max_chunk_size:
+                boundaries.append(position)
+                self._chunk_length = 0
+                self._delimiter_pending = False
+
+        self._window = self._roll(self._window, segment[:position])
+        return boundaries
+
+    def _prepend_zeros(self, prepend_bytes):
+        # after window_size zero bytes, further zero bytes do not change the state anymore
+        if prepend_bytes:
+            self._window = self._roll(self._window, bytes(min(prepend_bytes, self._window_size)))
+
+
+class RabinKarpMultiThresholdHash(_RabinKarp):
+    """Performs multi-level chunking of a given content, based on the thresholds specified during initialization.
+
+    Emulates `RabinKarpMultiThresholdHash` of the C++ extension exactly, which uses one chunker per threshold and
+    resets the chunkers of lower levels (by consuming zero bytes) whenever a chunk boundary at a higher level has been
+    found. As long as all chunkers have consumed at least window_size bytes since their last reset, only the most
+    restrictive chunker, which is never reset, is required (the others are not updated at all). Its hash values are
+    computed using vectorized operations, while the few positions at which other chunkers are required are processed
+    byte by byte.
+
+    The window of each chunker is either stored as `bytes` or, if it equals the window of the most restrictive chunker
+    after consuming the first `q` bytes of the current segment, as the integer `q`.
+    """
+
+    def __init__(self, window_size, seed, thresholds):
+        super(RabinKarpMultiThresholdHash, self).__init__(window_size, seed)
+        self._thresholds = [self._compute_threshold(threshold) for threshold in thresholds]
+        count = len(self._thresholds)
+        self._windows = [b''] * count
+        self._content_lengths = [0] * count  # saturating at window_size, which does not change results
+        self._least_restrictive_required_chunker_index = 0
+
+    def next_chunk_boundaries_with_thresholds(self, content, prepend_bytes):
+        if not self._thresholds:
+            return []
+
+        # prepend bytes as specified (all chunkers are affected)
+        prepend_zeros = bytes(min(prepend_bytes, self._window_size))
+        self._windows = [self._roll(window, prepend_zeros) for window in self._windows]
+
+        results = []
+        for offset, segment in _segments(content):
+            for boundary, threshold_index in self._process_segment(segment, prepend_zeros):
+                results.append(offset + boundary)
+                results.append(threshold_index)
+        return results
+
+    def _process_segment(self, segment, prepend_zeros):
+        """Consumes a segment of content, yielding (position, threshold index) pairs."""
+        n = self._window_size
+        count = len(self._thresholds)
+        last = count - 1
+        thresholds = self._thresholds
+        windows = self._windows
+        content_lengths = self._content_lengths
+
+        # the most restrictive chunker consumes all bytes, so its hash values are computed in advance
+        initial_window = windows[last]
+        hashvalues, first_full = self._hash_values(initial_window, segment)
+        candidates = numpy.flatnonzero(hashvalues[first_full:] < thresholds[0]) + first_full
+        candidate_index = 0
+
+        def materialize(window):
+            return self._roll(initial_window, segment[:window]) if isinstance(window, int) else window
+
+        lr = self._least_restrictive_required_chunker_index
+        # hash values of chunkers that are processed byte by byte
+        private_hashvalues = [None] * count
+        i = 0
+        length = len(segment)
+        while i < length:
+            if lr == last:
+                # only the most restrictive chunker is required, so skip to the next position that matches
+                candidate_index += numpy.searchsorted(candidates[candidate_index:], i)
+                if candidate_index == len(candidates):
+                    content_lengths[last] = min(n, content_lengths[last] + length - i)
+                    break
+                position = int(candidates[candidate_index])
+                content_lengths[last] = min(n, content_lengths[last] + position - i + 1)
+                hashvalue = int(hashvalues[position])
+                matching_threshold_index = 0
+                while matching_threshold_index < last and hashvalue < thresholds[matching_threshold_index + 1]:
+                    matching_threshold_index += 1
+            else:
+                # process a single byte using each chunker
+                position = i
+                b = int(segment[i])
+                new_lr = last
+                for j in range(last, lr - 1, -1):
+                    if j != last and not isinstance(windows[j], int):
+                        window = windows[j]
+                        hashvalue = private_hashvalues[j]
+                        if hashvalue is None:
+                            hashvalue = self._hash_value(window)
+                        if len(window) != n:
+                            hashvalue = (_B * hashvalue + self._hashvalues_list[b]) & _HASHMASK
+                            window += bytes((b,))
+                        else:
+                            hashvalue = (_B * hashvalue + self._hashvalues_list[b]
+                                         - self._b_to_n * self._hashvalues_list[window[0]]) & _HASHMASK
+                            window = window[1:] + bytes((b,))
+                        windows[j] = window
+                        private_hashvalues[j] = hashvalue
+                    content_lengths[j] = min(n, content_lengths[j] + 1)
+                    if content_lengths[j] < n:
+                        new_lr = j
+                    elif j != last and not isinstance(windows[j], int):
+                        # the chunker has consumed the same window_size bytes as the most restrictive one
+                        windows[j] = 0
+                        private_hashvalues[j] = None
+
+                # chunkers sharing the window of the most restrictive chunker move along with it
+                for j in range(lr, last):
+                    if isinstance(windows[j], int):
+                        windows[j] = position + 1
+                lr = new_lr
+
+                matching_threshold_index = -1
+                for threshold_index in range(count):
+                    used_chunker_index = max(threshold_index, lr)
+                    if used_chunker_index == last or isinstance(windows[used_chunker_index], int):
+                        full = position >= first_full
+                        hashvalue = int(hashvalues[position])
+                    else:
+                        full = len(windows[used_chunker_index]) == n
+                        hashvalue = private_hashvalues[used_chunker_index]
+                    if full and hashvalue < thresholds[threshold_index]:
+                        matching_threshold_index = threshold_index
+                    elif content_lengths[used_chunker_index] >= n:
+                        break
+                if matching_threshold_index == -1:
+                    i += 1
+                    continue
+
+            # add found boundary to list of boundaries
+            yield position + 1, matching_threshold_index
+
+            # reset chunkers for lower-level nodes
+            for j in range(matching_threshold_index):
+                windows[j] = self._roll(materialize(windows[j]), prepend_zeros)
+                private_hashvalues[j] = None
+                content_lengths[j] = 0
+
+            # chunkers between the matching and the least restrictive required one are used again
+            for j in range(matching_threshold_index, lr):
+                windows[j] = position + 1
+                private_hashvalues[j] = None
+            lr = 0
+            i = position + 1
+
+        self._windows = [materialize(window) for window in windows[:last]] + [self._roll(initial_window, segment)]
+        self._least_restrictive_required_chunker_index = lr
+
+
+class RabinKarpHashGroup(object):
+    """Several independent `RabinKarpHash` chunkers processing the same content segment by segment (see
+    `RabinKarpHashGroup` of the C++ extension)."""
+
+    def __init__(self, window_sizes, seeds, thresholds):
+        self._hashes = []
+        for window_size, seed, threshold in zip(window_sizes, seeds, thresholds):
+            rolling_hash = RabinKarpHash(window_size, seed)
+            rolling_hash.set_threshold(threshold)
+            self._hashes.append(rolling_hash)
+
+    def next_chunk_boundaries(self, content, prepend_bytes):
+        results = []
+        for rolling_hash in self._hashes:
+            rolling_hash._prepend_zeros(prepend_bytes)
+        for offset, segment in _segments(content):
+            for index, rolling_hash in enumerate(self._hashes):
+                for boundary in rolling_hash.next_chunk_boundaries(segment, 0):
+                    results.extend((offset + boundary, index))
+        return results
+
+
+class AsymmetricExtremum(object):
+    """Chunking based on the asymmetric extremum (AE) algorithm (see `AsymmetricExtremum` of the C++ extension).
+
+    Instead of comparing values byte by byte, the positions at which the maximum value within a chunk increases
+    (records) are determined using vectorized operations. A chunk ends window_size bytes after the first record that is
+    followed by no further record within window_size bytes.
+    """
+
+    def __init__(self, window_size):
+        self._window_size = window_size
+        self._value = 0
+        self._position = 0
+        self._max_value = 0
+        self._max_position = 0
+
+    def next_chunk_boundaries(self, content, prepend_bytes):
+        # prepended zero bytes are processed like content, but chunk boundaries within them are not reported
+        self._prepend_zeros(prepend_bytes)
+
+        results = []
+        for offset, segment in _segments(content):
+            results.extend((self._process(segment) + (offset + 1)).tolist())
+        return results
+
+    def next_chunk_boundary(self, content):
+        # examine content in increasingly large pieces, as to not process much content following the first boundary
+        content = numpy.frombuffer(content, dtype=numpy.uint8)
+        offset, piece_size = 0, 4096
+        while offset < len(content):
+            piece = content[offset:offset + piece_size]
+            boundaries = self._process(piece, first_only=True)
+            if len(boundaries):
+                return offset + int(boundaries[0]) + 1
+            offset += len(piece)
+            piece_size = min(2 * piece_size, _SEGMENT_SIZE)
+        return -1
+
+    def _prepend_zeros(self, count):
+        # after 8 zero bytes, the value is 0, and the current chunk ends after at most window_size + 1 further zero
+        # bytes (see `prepend_zeros` of the C++ extension)
+        head = min(count, 8)
+        self._process(numpy.zeros(head, dtype=numpy.uint8))
+        count -= head
+        if self._position:
+            head = min(count, self._max_position + self._window_size - self._position + 1)
+            self._process(numpy.zeros(head, dtype=numpy.uint8))
+            count -= head
+
+        # subsequent chunks consist of window_size + 1 zero bytes each, after which the state is the same again
+        self._process(numpy.zeros(count % (self._window_size + 1), dtype=numpy.uint8))
+
+    def _process(self, content, first_only=False):
+        """Consumes content (a uint8 array) and returns the positions of the last bytes of all chunks ending within, or
+        consumes content only up to the end of the first chunk ending within if `first_only` is set."""
+        if not len(content):
+            return numpy.empty(0, dtype=numpy.int64)
+
+        # value of each position, i.e., the 8 bytes ending at this position
+        previous = numpy.array([(self._value >> (8 * (6 - i))) & 0xFF for i in range(7)], dtype=numpy.uint8)
+        extended = numpy.concatenate((previous, content)).astype(numpy.uint64)
+        values = numpy.zeros(len(content), dtype=numpy.uint64)
+        for i in range(8):
+            values |= extended[7 - i:len(extended) - i] << numpy.uint64(8 * i)
+        self._value = int(values[-1])
+
+        boundaries = []
+        lookahead = max(2 * self._window_size, 64)
+        pos = 0
+        while pos < len(values):
+            if not self._position:
+                # a chunk starts
+                self._max_value = int(values[pos])
+                self._max_position = 0
+                self._position = 1
+                pos += 1
+                continue
+
+            # records within the segment, following the current maximum (at a position preceding the segment)
+            segment = values[pos:pos + lookahead]
+            running_max = numpy.maximum(numpy.maximum.accumulate(segment), numpy.uint64(self._max_value))
+            is_record = numpy.empty(len(segment), dtype=bool)
+            is_record[0] = segment[0] > self._max_value
+            numpy.greater(segment[1:], running_max[:-1], out=is_record[1:])
+            records = numpy.concatenate(([self._max_position], numpy.flatnonzero(is_record) + self._position))
+
+            # first record not followed by another one within window_size positions
+            cuts = numpy.flatnonzero(numpy.diff(records) > self._window_size)
+            cut = int(records[cuts[0]] if len(cuts) else records[-1]) + self._window_size
+            if cut < self._position + len(segment):
+                pos += cut - self._position
+                boundaries.append(pos)
+                self._position = 0
+                if first_only:
+                    self._value = int(values[pos])
+                    break
+                pos += 1
+            else:
+                self._max_value = int(running_max[-1])
+                self._max_position = int(records[-1])
+                self._position += len(segment)
+                pos += len(segment)
+        return numpy.array(boundaries, dtype=numpy.int64)
+
+
+class RapidAsymmetricMaximum(object):
+    """Chunking based on the rapid asymmetric maximum (RAM) algorithm (see `RapidAsymmetricMaximum` of the C++
+    extension)."""
+
+    def __init__(self, window_size):
+        self._window_size = window_size
+        self._position = 0  # saturating at window_size
+        self._max_value = 0
+
+    def next_chunk_boundaries(self, content, prepend_bytes):
+        # prepended zero bytes are processed like content, but chunk boundaries within them are not reported
+        self._prepend_zeros(prepend_bytes)
+
+        results = []
+        for offset, segment in _segments(content):
+            results.extend(offset + boundary for boundary in self._process(segment))
+        return results
+
+    def next_chunk_boundary(self, content):
+        for offset, segment in _segments(content):
+            boundaries = self._process(segment, first_only=True)
+            if boundaries:
+                return offset + boundaries[0]
+        return -1
+
+    def _prepend_zeros(self, count):
+        # zero bytes never end a chunk whose maximum value is not 0 (see `prepend_zeros` of the C++ extension)
+        if self._position and self._max_value:
+            self._position = min(self._position + count, self._window_size)
+            return
+        if self._position:
+            head = min(count, self._window_size - self._position + 1)
+            self._process(numpy.zeros(head, dtype=numpy.uint8))
+            count -= head
+
+        # subsequent chunks consist of window_size + 1 zero bytes each, after which the state is the same again
+        self._process(numpy.zeros(count % (self._window_size + 1), dtype=numpy.uint8))
+
+    def _process(self, content, first_only=False):
+        """Consumes content (a uint8 array) and returns the positions following all chunks ending within, or consumes
+        content only up to the end of the first chunk ending within if `first_only` is set."""
+        boundaries = []
+        pos = 0
+        while pos < len(content):
+            if self._position < self._window_size:
+                # maximum within the first window_size bytes of the chunk
+                window = content[pos:pos + self._window_size - self._position]
+                window_max = int(window.max())
+                self._max_value = max(self._max_value, window_max) if self._position else window_max
+                self._position += len(window)
+                pos += len(window)
+                continue
+
+            # first subsequent byte not less than the maximum
+            matches = numpy.flatnonzero(content[pos:pos + 4096] >= self._max_value)
+            if not len(matches):
+                pos += 4096
+                continue
+            pos += int(matches[0]) + 1
+            boundaries.append(pos)
+            self._position = 0
+            if first_only:
+                break
+        return boundaries
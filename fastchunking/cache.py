@@ -0,0 +1,267 @@
+"""Persistent caching of chunking results of files.
+
+* :class:`.BoundaryCache`: Caches chunk boundaries (and chunk digests) of files, so that unchanged files do not need to
+  be chunked again.
+"""
+import array
+import os
+import sqlite3
+import sys
+
+import fastchunking
+
+# default total size of the cached data (in bytes) above which least recently used entries are evicted
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    strategy TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    boundaries BLOB NOT NULL,
+    levels BLOB,
+    digests BLOB,
+    digest_size INTEGER,
+    entry_size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (device, inode, strategy)
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+'''
+
+
+def strategy_fingerprint(chunking_strategy, chunk_sizes, multilevel=False):
+    """Computes a string identifying a chunking configuration, i.e., all parameters affecting chunk boundaries.
+
+    Args:
+        chunking_strategy (BaseChunkingStrategy): The chunking strategy.
+        chunk_sizes (list): The (expected) target chunk sizes.
+        multilevel (Optional[bool]): Whether chunk boundaries are computed by a multi-level chunker.
+
+    Returns:
+        str: The fingerprint, consisting of the class of the chunking strategy, the values of its attributes, the chunk
+            sizes, and the version of `fastchunking` (as chunking algorithms might change between versions).
+    """
+    strategy_class = type(chunking_strategy)
+    slots = sorted(set(slot for cls in strategy_class.__mro__ for slot in getattr(cls, '__slots__', ())))
+    parameters = ','.join('{}={!r}'.format(slot, getattr(chunking_strategy, slot)) for slot in slots
+                          if hasattr(chunking_strategy, slot))
+    return '{}.{}({});chunk_sizes={};multilevel={};version={}'.format(
+        strategy_class.__module__, strategy_class.__qualname__, parameters, list(chunk_sizes), bool(multilevel),
+        fastchunking.__version__)
+
+
+class CacheEntry(object):
+    """Cached chunking results of a file.
+
+    Attributes:
+        boundaries (array.array): Chunk boundary positions.
+        levels (Optional[array.array]): Chunker index of each chunk boundary (for multi-level chunkers).
+        digests (Optional[list]): Digests of the chunks of the file (e.g., SHA-256 fingerprints), if cached.
+    """
+
+    __slots__ = ('boundaries', 'levels', 'digests')
+
+    def __init__(self, boundaries, levels=None, digests=None):
+        self.boundaries = boundaries
+        self.levels = levels
+        self.digests = digests
+
+
+class BoundaryCache(object):
+    """Persistent cache of chunking results of files, stored in an SQLite database.
+
+    Entries are keyed by device and inode number of a file along with a fingerprint of the chunking configuration (see
+    :func:`.strategy_fingerprint`), and they are only valid as long as size and modification time of the file remain
+    unchanged. Thus, changed files, as well as changed chunking parameters, result in cache misses. Least recently used
+    entries are evicted if the total size of all entries exceeds a limit.
+
+    Example:
+        >>> with BoundaryCache('boundaries.db') as cache:
+        ...     boundaries = cache.next_chunk_boundaries_file('disk.img', RabinKarpCDC(48, 0), 4096)
+    """
+
+    __slots__ = ('_connection', '_max_size', '_size', '_clock')
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        """
+        Args:
+            path (str): Path of the database file, which is created if it does not exist.
+            max_size (Optional[int]): Total size of all entries (in bytes) above which entries are evicted.
+        """
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+        self._max_size = max_size
+        self._size, self._clock = self._connection.execute(
+            'SELECT IFNULL(SUM(entry_size), 0), IFNULL(MAX(last_used), 0) FROM entries').fetchone()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def get(self, file, chunking_strategy, chunk_sizes, multilevel=False):
+        """Retrieves the cached chunking results of a file, without reading the file.
+
+        Args:
+            file: Path of the file.
+            chunking_strategy (BaseChunkingStrategy): The chunking strategy.
+            chunk_sizes (list): The (expected) target chunk sizes.
+            multilevel (Optional[bool]): Whether chunk boundaries are computed by a multi-level chunker.
+
+        Returns:
+            Optional[CacheEntry]: The cached chunking results, or None if the file is not cached or has changed.
+        """
+        stat_result = os.stat(file)
+        key = (stat_result.st_dev, stat_result.st_ino, strategy_fingerprint(chunking_strategy, chunk_sizes, multilevel))
+        row = self._connection.execute(
+            'SELECT size, mtime_ns, boundaries, levels, digests, digest_size FROM entries '
+            'WHERE device = ? AND inode = ? AND strategy = ?', key).fetchone()
+        if row is None or row[:2] != (stat_result.st_size, stat_result.st_mtime_ns):
+            return None
+
+        self._clock += 1
+        with self._connection:
+            self._connection.execute('UPDATE entries SET last_used = ? WHERE device = ? AND inode = ? AND strategy = ?',
+                                     (self._clock,) + key)
+        _, _, boundaries, levels, digests, digest_size = row
+        if digests is not None:
+            # the digest size is 0 if there are no digests (e.g., of an empty file)
+            digests = [digests[offset:offset + digest_size] for offset in range(0, len(digests), digest_size or 1)]
+        return CacheEntry(_unpack_array('Q', boundaries), _unpack_array('H', levels) if levels is not None else None,
+                          digests)
+
+    def put(self, file, chunking_strategy, chunk_sizes, boundaries, levels=None, digests=None, multilevel=False,
+            stat_result=None):
+        """Caches the chunking results of a file, replacing any cached results for the same chunking configuration.
+
+        Args:
+            file: Path of the file.
+            chunking_strategy (BaseChunkingStrategy): The chunking strategy.
+            chunk_sizes (list): The (expected) target chunk sizes.
+            boundaries (iterable): Chunk boundary positions.
+            levels (Optional[iterable]): Chunker index of each chunk boundary (for multi-level chunkers).
+            digests (Optional[list]): Digests of the chunks of the file, all of the same size.
+            multilevel (Optional[bool]): Whether chunk boundaries are computed by a multi-level chunker.
+            stat_result (Optional[os.stat_result]): Status of the file at the time it has been chunked, so that
+                results of a file that has been modified since are not cached. Defaults to the current status.
+        """
+        if stat_result is None:
+            stat_result = os.stat(file)
+        boundaries = _pack_array('Q', boundaries)
+        levels = _pack_array('H', levels) if levels is not None else None
+        digest_size = len(digests[0]) if digests else 0
+        digests = b''.join(digests) if digests is not None else None
+        entry_size = len(boundaries) + len(levels or b'') + len(digests or b'')
+        if entry_size > self._max_size:
+            return
+
+        key = (stat_result.st_dev, stat_result.st_ino, strategy_fingerprint(chunking_strategy, chunk_sizes, multilevel))
+        self._clock += 1
+        with self._connection:
+            self._size -= self._delete(key)
+            self._connection.execute('INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                     key + (stat_result.st_size, stat_result.st_mtime_ns, boundaries, levels, digests,
+                                            digest_size, entry_size, self._clock))
+            self._size += entry_size
+            self._evict()
+
+    def next_chunk_boundaries_file(self, file, chunking_strategy, chunk_size):
+        """Computes the chunk boundaries of a file, returning cached results if the file has not changed.
+
+        Args:
+            file: Path of the file.
+            chunking_strategy (BaseChunkingStrategy): The chunking strategy.
+            chunk_size (int): (Expected) target chunk size.
+
+        Returns:
+            list: List of chunk boundary positions, see :meth:`.BaseChunker.next_chunk_boundaries_file`.
+        """
+        entry = self.get(file, chunking_strategy, [chunk_size])
+        if entry is not None:
+            return entry.boundaries.tolist()
+
+        stat_result = os.stat(file)
+        boundaries = list(chunking_strategy.create_chunker(chunk_size).next_chunk_boundaries_file(file))
+        if _unchanged(file, stat_result):
+            self.put(file, chunking_strategy, [chunk_size], boundaries, stat_result=stat_result)
+        return boundaries
+
+    def next_chunk_boundaries_levels_file(self, file, chunking_strategy, chunk_sizes):
+        """Computes the chunk boundaries of a file using a multi-level chunker, returning cached results if the file
+        has not changed.
+
+        Args:
+            file: Path of the file.
+            chunking_strategy (BaseChunkingStrategy): The chunking strategy.
+            chunk_sizes (list): List of (expected) target chunk sizes, see
+                :meth:`.BaseChunkingStrategy.create_multilevel_chunker`.
+
+        Returns:
+            list: List of tuples (boundary, level), see :meth:`.BaseMultiLevelChunker.next_chunk_boundaries_levels`.
+        """
+        entry = self.get(file, chunking_strategy, chunk_sizes, multilevel=True)
+        if entry is not None:
+            return list(zip(entry.boundaries.tolist(), entry.levels.tolist()))
+
+        stat_result = os.stat(file)
+        boundaries_with_levels = chunking_strategy.create_multilevel_chunker(
+            chunk_sizes).next_chunk_boundaries_levels_file(file)
+        if _unchanged(file, stat_result):
+            self.put(file, chunking_strategy, chunk_sizes, [boundary for boundary, _ in boundaries_with_levels],
+                     [level for _, level in boundaries_with_levels], multilevel=True, stat_result=stat_result)
+        return boundaries_with_levels
+
+    def close(self):
+        """Closes the database."""
+        self._connection.close()
+
+    def _delete(self, key):
+        """Deletes an entry (if it exists) and returns its size."""
+        row = self._connection.execute(
+            'SELECT entry_size FROM entries WHERE device = ? AND inode = ? AND strategy = ?', key).fetchone()
+        if row is None:
+            return 0
+        self._connection.execute('DELETE FROM entries WHERE device = ? AND inode = ? AND strategy = ?', key)
+        return row[0]
+
+    def _evict(self):
+        """Deletes least recently used entries until the total size of all entries does not exceed the limit."""
+        while self._size > self._max_size:
+            device, inode, strategy, entry_size = self._connection.execute(
+                'SELECT device, inode, strategy, entry_size FROM entries ORDER BY last_used LIMIT 1').fetchone()
+            self._connection.execute('DELETE FROM entries WHERE device = ? AND inode = ? AND strategy = ?',
+                                     (device, inode, strategy))
+            self._size -= entry_size
+
+
+def _unchanged(file, stat_result):
+    """Returns whether size and modification time of a file match the given status."""
+    current_stat_result = os.stat(file)
+    return ((current_stat_result.st_dev, current_stat_result.st_ino, current_stat_result.st_size,
+             current_stat_result.st_mtime_ns) ==
+            (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns))
+
+
+def _pack_array(typecode, values):
+    """Packs integers into little-endian binary data."""
+    values = array.array(typecode, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack_array(typecode, data):
+    """Unpacks integers packed by :func:`._pack_array`."""
+    values = array.array(typecode, data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
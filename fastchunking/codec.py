@@ -0,0 +1,268 @@
+"""Deduplicating wire format for transferring similar binary streams between peers.
+
+* :class:`.StreamEncoder`: Encodes streams, replacing chunks known to be cached by the peer with short references.
+
+* :class:`.StreamDecoder`: Decodes streams encoded by a :class:`.StreamEncoder`.
+
+Both ends maintain a chunk cache of the same (bounded) size. As the cache is only modified in the order of the records
+of the encoded streams, both caches always contain the same chunks, without any communication from the decoder to the
+encoder. Thus, an encoder and a decoder form a pair that has to be used for the same sequence of streams. If a stream
+has not been encoded entirely (e.g., due to an error), the next stream makes both ends clear their caches.
+"""
+import collections
+import hashlib
+import struct
+
+from fastchunking.pipeline import DEFAULT_BLOCK_SIZE, iter_chunks
+
+_STREAM_MAGIC = b'FCDDS\0\0\2'
+# stream header: maximum cache size, flags
+_STREAM_HEADER = struct.Struct('>QB')
+# flag indicating that both ends clear their caches before the stream
+_FLAG_RESET = 1
+
+# record: type, value (chunk length for literals, chunk id for references, content length for the end of a stream)
+_RECORD = struct.Struct('>BQ')
+_RECORD_LITERAL = 0
+_RECORD_REFERENCE = 1
+_RECORD_END = 2
+
+# default total size of the chunks held by the caches of both ends
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# default maximum size of chunks, above which chunks are split by the encoder and rejected by the decoder
+DEFAULT_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+# minimum amount of encoded data output at once (except for the end of a stream)
+_OUTPUT_SIZE = 64 * 1024
+
+
+class _ChunkCache(object):
+    """Size-bounded LRU cache of chunks, which are identified by ids assigned in the order of insertion.
+
+    Values are opaque to the cache, only the chunk lengths determine which chunks are evicted.
+    """
+
+    __slots__ = ('max_size', '_size', '_next_id', '_entries')
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._size = 0
+        self._next_id = 0
+        self._entries = collections.OrderedDict()  # id -> (length, value), least recently used first
+
+    def get(self, chunk_id):
+        """Returns the value of a cached chunk and marks it as most recently used, or raises a `KeyError`."""
+        length, value = self._entries[chunk_id]
+        self._entries.move_to_end(chunk_id)
+        return value
+
+    def add(self, length, value):
+        """Inserts a chunk unless it is larger than the cache, evicting the least recently used chunks as needed.
+
+        Returns:
+            tuple: The id of the inserted chunk (or None), and a list of the values of the evicted chunks.
+        """
+        if length > self.max_size:
+            return None, []
+
+        evicted_values = []
+        self._size += length
+        while self._size > self.max_size:
+            _, (evicted_length, evicted_value) = self._entries.popitem(last=False)
+            self._size -= evicted_length
+            evicted_values.append(evicted_value)
+
+        chunk_id = self._next_id
+        self._next_id += 1
+        self._entries[chunk_id] = (length, value)
+        return chunk_id, evicted_values
+
+
+class StreamEncoder(object):
+    """Encodes binary streams using content-defined chunking, so that chunks recently transferred to the peer (within
+    any previous or the current stream) are replaced with references.
+
+    Only fingerprints of cached chunks are held by the encoder, the chunks themselves are held by the decoder. The cache
+    of the encoder is updated while a stream is encoded, i.e., before the decoder receives the respective records. Thus,
+    if a stream is not encoded entirely (e.g., if reading it fails or if the generator returned by :meth:`.encode` is
+    not exhausted), the caches of both ends are cleared at the beginning of the next stream.
+
+    Example:
+        >>> encoder = StreamEncoder(RabinKarpCDC(48, 0), 4096)
+        >>> for data in encoder.encode(open('file', 'rb')):
+        ...     sock.sendall(data)
+    """
+
+    __slots__ = ('_chunking_strategy', '_chunk_size', '_max_chunk_size', '_block_size', '_cache', '_chunk_ids',
+                 '_complete')
+
+    def __init__(self, chunking_strategy, chunk_size, max_cache_size=DEFAULT_CACHE_SIZE, block_size=DEFAULT_BLOCK_SIZE,
+                 max_chunk_size=DEFAULT_MAX_CHUNK_SIZE):
+        """
+        Args:
+            chunking_strategy (BaseChunkingStrategy): The chunking strategy, e.g., a :class:`.RabinKarpCDC`.
+            chunk_size (int): (Expected) target chunk size.
+            max_cache_size (Optional[int]): Total size of the chunks held by the caches of both ends, which has to be
+                the same for the decoder.
+            block_size (Optional[int]): Size of the blocks in which streams are read.
+            max_chunk_size (Optional[int]): Size above which chunks are split into several chunks, which must not
+                exceed the maximum chunk size of the decoder.
+
+        Raises:
+            ValueError: If `max_chunk_size` is not positive.
+        """
+        if max_chunk_size < 1:
+            raise ValueError('maximum chunk size has to be positive')
+        self._chunking_strategy = chunking_strategy
+        self._chunk_size = chunk_size
+        self._max_chunk_size = max_chunk_size
+        self._block_size = block_size
+        self._cache = _ChunkCache(max_cache_size)
+        self._chunk_ids = {}  # fingerprint -> id of all cached chunks
+        self._complete = True  # whether the previous stream has been encoded entirely
+
+    def encode(self, stream):
+        """Encodes the content of `stream`.
+
+        Every stream is chunked using a new chunker, so that chunk boundaries do not depend on previous streams.
+
+        Args:
+            stream: A binary file-like object providing a `readinto` or `read` method.
+
+        Yields:
+            bytes: The encoded stream, in pieces.
+        """
+        flags = 0
+        if not self._complete:
+            # the decoder might not have received all records of the previous stream
+            self._cache = _ChunkCache(self._cache.max_size)
+            self._chunk_ids = {}
+            flags |= _FLAG_RESET
+        self._complete = False
+
+        output = bytearray(_STREAM_MAGIC + _STREAM_HEADER.pack(self._cache.max_size, flags))
+        content_length = 0
+        chunker = self._chunking_strategy.create_chunker(self._chunk_size)
+        for chunk in _split_chunks(iter_chunks(stream, chunker, self._block_size), self._max_chunk_size):
+            content_length += len(chunk)
+            fingerprint = hashlib.sha256(chunk).digest()
+            chunk_id = self._chunk_ids.get(fingerprint)
+            if chunk_id is not None:
+                self._cache.get(chunk_id)
+                output += _RECORD.pack(_RECORD_REFERENCE, chunk_id)
+            else:
+                output += _RECORD.pack(_RECORD_LITERAL, len(chunk))
+                output += chunk
+                chunk_id, evicted_fingerprints = self._cache.add(len(chunk), fingerprint)
+                for evicted_fingerprint in evicted_fingerprints:
+                    del self._chunk_ids[evicted_fingerprint]
+                if chunk_id is not None:
+                    self._chunk_ids[fingerprint] = chunk_id
+
+            if len(output) >= _OUTPUT_SIZE:
+                yield bytes(output)
+                output = bytearray()
+
+        output += _RECORD.pack(_RECORD_END, content_length)
+        yield bytes(output)
+        self._complete = True
+
+
+class StreamDecoder(object):
+    """Decodes binary streams encoded by a :class:`.StreamEncoder`.
+
+    The same file-like object has to be used for all streams transferred over a connection, as it might buffer data
+    following the end of a stream.
+
+    Example:
+        >>> decoder = StreamDecoder()
+        >>> stream = sock.makefile('rb')
+        >>> for output in outputs:
+        ...     for chunk in decoder.decode(stream):
+        ...         output.write(chunk)
+    """
+
+    __slots__ = ('_cache', '_max_chunk_size')
+
+    def __init__(self, max_cache_size=DEFAULT_CACHE_SIZE, max_chunk_size=DEFAULT_MAX_CHUNK_SIZE):
+        """
+        Args:
+            max_cache_size (Optional[int]): Total size of the chunks held by the cache, which has to be the same for the
+                encoder.
+            max_chunk_size (Optional[int]): Size of the largest accepted chunk, which must not be less than the
+                maximum chunk size of the encoder. Limits the memory allocated for corrupted or malicious streams.
+        """
+        self._cache = _ChunkCache(max_cache_size)
+        self._max_chunk_size = max_chunk_size
+
+    def decode(self, stream):
+        """Decodes a single encoded stream, leaving `stream` positioned after its end.
+
+        Args:
+            stream: A binary file-like object providing a `read` method.
+
+        Yields:
+            bytes: The decoded content, in chunks.
+
+        Raises:
+            ValueError: If `stream` does not contain a valid encoded stream of a matching encoder.
+        """
+        if _read_exactly(stream, len(_STREAM_MAGIC)) != _STREAM_MAGIC:
+            raise ValueError('not an encoded stream')
+        max_cache_size, flags = _STREAM_HEADER.unpack(_read_exactly(stream, _STREAM_HEADER.size))
+        if max_cache_size != self._cache.max_size:
+            raise ValueError('cache size of the encoder ({}) does not match cache size of the decoder ({})'.format(
+                max_cache_size, self._cache.max_size))
+        if flags & ~_FLAG_RESET:
+            raise ValueError('invalid flags {}'.format(flags))
+        if flags & _FLAG_RESET:
+            self._cache = _ChunkCache(self._cache.max_size)
+
+        content_length = 0
+        while True:
+            record_type, value = _RECORD.unpack(_read_exactly(stream, _RECORD.size))
+            if record_type == _RECORD_LITERAL:
+                if value > self._max_chunk_size:
+                    raise ValueError('chunk length {} exceeds the maximum chunk size ({})'.format(
+                        value, self._max_chunk_size))
+                chunk = _read_exactly(stream, value)
+                self._cache.add(len(chunk), chunk)
+            elif record_type == _RECORD_REFERENCE:
+                try:
+                    chunk = self._cache.get(value)
+                except KeyError:
+                    raise ValueError('reference to chunk {} not contained in the cache'.format(value)) from None
+            elif record_type == _RECORD_END:
+                if value != content_length:
+                    raise ValueError('invalid content length')
+                return
+            else:
+                raise ValueError('invalid record type {}'.format(record_type))
+
+            content_length += len(chunk)
+            yield chunk
+
+
+def _split_chunks(chunks, max_chunk_size):
+    """Splits chunks larger than `max_chunk_size` into several chunks."""
+    for chunk in chunks:
+        if len(chunk) <= max_chunk_size:
+            yield chunk
+        else:
+            for offset in range(0, len(chunk), max_chunk_size):
+                yield chunk[offset:offset + max_chunk_size]
+
+
+def _read_exactly(stream, length):
+    """Reads exactly `length` bytes from `stream`, or raises a `ValueError` if the stream ends before."""
+    data = stream.read(length)
+    if len(data) < length:
+        data = bytearray(data)
+        while len(data) < length:
+            block = stream.read(length - len(data))
+            if not block:
+                raise ValueError('truncated stream')
+            data += block
+        data = bytes(data)
+    return data
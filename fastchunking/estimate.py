@@ -0,0 +1,136 @@
+"""Estimation of deduplication ratios of large datasets.
+
+* :class:`.DedupEstimator`: Estimates the deduplication ratio of binary streams or files based on a sample of chunks.
+"""
+import hashlib
+import math
+import random
+
+from fastchunking.pipeline import DEFAULT_BLOCK_SIZE, iter_chunks
+
+# quantile of the standard normal distribution for 95% confidence intervals
+_Z_95 = 1.959964
+
+
+class DedupEstimator(object):
+    """Estimates the deduplication ratio (i.e., total size divided by the size of all unique chunks) of binary streams
+    or files for a specific chunking configuration.
+
+    All content is chunked, but only chunks whose SHA-256 fingerprints fall below a threshold are kept (along with
+    their sizes and number of occurrences). As sampling is based on the content of chunks, a chunk is either always or
+    never sampled, so the number of occurrences of each sampled chunk is exact, and memory consumption is proportional
+    to the sample rate. The deduplication ratio is estimated using a ratio estimator over the sampled unique chunks.
+
+    Example:
+        >>> estimator = DedupEstimator(RabinKarpCDC(48, 0), 4096, sample_rate=1 / 4096)
+        >>> estimator.add_files(paths, file_fraction=0.1, seed=0)
+        >>> estimator.ratio, estimator.confidence_interval()
+
+    Attributes:
+        bytes (int): Total size of all content processed so far.
+        files (int): Number of files processed so far.
+    """
+
+    __slots__ = ('_chunking_strategy', '_chunk_size', '_sample_rate', '_threshold', '_block_size', '_samples', 'bytes',
+                 'files')
+
+    def __init__(self, chunking_strategy, chunk_size, sample_rate=1 / 1024, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            chunking_strategy (BaseChunkingStrategy): The chunking strategy, e.g., a :class:`.RabinKarpCDC`.
+            chunk_size (int): (Expected) target chunk size.
+            sample_rate (Optional[float]): Fraction of unique chunks that are sampled, in the range (0, 1].
+            block_size (Optional[int]): Size of the blocks in which streams are read.
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError('sample rate has to be in the range (0, 1]')
+        self._chunking_strategy = chunking_strategy
+        self._chunk_size = chunk_size
+        self._sample_rate = sample_rate
+        self._threshold = int(sample_rate * 2 ** 64)  # compared with the first 8 bytes of fingerprints
+        self._block_size = block_size
+        self._samples = {}  # fingerprint -> (chunk size, number of occurrences)
+        self.bytes = 0
+        self.files = 0
+
+    def add_stream(self, stream):
+        """Chunks the content of `stream` and samples its chunks.
+
+        Every stream is chunked using a new chunker, as if it was a separate file.
+
+        Args:
+            stream: A binary file-like object providing a `readinto` or `read` method.
+        """
+        chunker = self._chunking_strategy.create_chunker(self._chunk_size)
+        for chunk in iter_chunks(stream, chunker, self._block_size):
+            self.bytes += len(chunk)
+            fingerprint = hashlib.sha256(chunk).digest()
+            if int.from_bytes(fingerprint[:8], 'big') < self._threshold:
+                _, count = self._samples.get(fingerprint, (0, 0))
+                self._samples[fingerprint] = (len(chunk), count + 1)
+
+    def add_files(self, paths, file_fraction=1.0, seed=None):
+        """Chunks the content of files and samples their chunks.
+
+        Optionally, only a random subset of the files is processed, which speeds up estimation if the deduplication
+        ratio of the subset is representative of the whole dataset. Note that duplicates between processed and skipped
+        files are not taken into account, so the estimated deduplication ratio of the whole dataset tends to be too low.
+
+        Args:
+            paths (iterable): Paths of the files.
+            file_fraction (Optional[float]): Probability with which each file is processed.
+            seed (Optional[int]): Seed determining the processed files.
+        """
+        generator = random.Random(seed)
+        for path in paths:
+            if file_fraction < 1 and generator.random() >= file_fraction:
+                continue
+            with open(path, 'rb') as file_:
+                self.add_stream(file_)
+            self.files += 1
+
+    @property
+    def sampled_chunks(self):
+        """int: Number of unique chunks sampled so far."""
+        return len(self._samples)
+
+    @property
+    def ratio(self):
+        """float: The estimated deduplication ratio, or 1.0 if no chunk has been sampled yet."""
+        unique_bytes = sum(size for size, _ in self._samples.values())
+        if not unique_bytes:
+            return 1.0
+        return sum(size * count for size, count in self._samples.values()) / unique_bytes
+
+    @property
+    def unique_bytes(self):
+        """float: The estimated total size of all unique chunks."""
+        return self.bytes / self.ratio
+
+    def confidence_interval(self, z=_Z_95):
+        """Computes an approximate confidence interval of the deduplication ratio.
+
+        The variance of the ratio estimator is approximated by ``(1 - q) * sum((c * s - R * s) ** 2) / sum(s) ** 2``,
+        summing over sampled unique chunks with sizes s and numbers of occurrences c, where q is the sample rate and R
+        is the estimated ratio. The interval is only meaningful if a sufficient number of chunks (e.g., some hundreds)
+        has been sampled.
+
+        Args:
+            z (Optional[float]): Quantile of the standard normal distribution, defaults to a 95% confidence level.
+
+        Returns:
+            tuple: Lower and upper bound of the deduplication ratio. The lower bound is never less than 1.0.
+        """
+        ratio = self.ratio
+        unique_bytes = sum(size for size, _ in self._samples.values())
+        if not unique_bytes:
+            return 1.0, 1.0
+        variance = ((1 - self._sample_rate) * sum((size * count - ratio * size) ** 2
+                                                  for size, count in self._samples.values()) / unique_bytes ** 2)
+        deviation = z * math.sqrt(variance)
+        return max(1.0, ratio - deviation), ratio + deviation
+
+    def __repr__(self):
+        lower, upper = self.confidence_interval()
+        return '{}(ratio={:f}, lower={:f}, upper={:f}, bytes={}, sampled_chunks={})'.format(
+            type(self).__name__, self.ratio, lower, upper, self.bytes, self.sampled_chunks)
@@ -0,0 +1,143 @@
+"""Multi-process chunking.
+
+* :class:`.ProcessChunkerPool`: Chunks messages in worker processes, passing them via shared memory.
+"""
+import array
+import collections
+import concurrent.futures
+import os
+import threading
+from multiprocessing import shared_memory
+
+# smallest shared memory segment size
+_MIN_SEGMENT_SIZE = 64 * 1024
+
+# shared memory segments attached by a worker process, by name
+_worker_segments = {}
+_worker_chunking_strategy = None
+_worker_chunk_size = None
+
+
+def _initialize_worker(chunking_strategy, chunk_size):
+    global _worker_chunking_strategy, _worker_chunk_size
+    _worker_chunking_strategy = chunking_strategy
+    _worker_chunk_size = chunk_size
+
+
+def _attach_segment(name):
+    segment = _worker_segments.get(name)
+    if segment is None:
+        # worker processes share the resource tracker of the pool, so segments are only unlinked by the pool
+        segment = _worker_segments[name] = shared_memory.SharedMemory(name)
+    return segment
+
+
+def _chunk_segment(name, length):
+    with _attach_segment(name).buf[:length] as buf:
+        chunker = _worker_chunking_strategy.create_chunker(_worker_chunk_size)
+        return array.array('Q', chunker.next_chunk_boundaries(buf))
+
+
+class ProcessChunkerPool(object):
+    """Pool of worker processes performing chunking.
+
+    Messages are not pickled, but copied into shared memory segments, on which the workers operate directly. Only the
+    resulting chunk boundaries are passed back. Segments are reused for subsequent messages, so no memory is allocated
+    in a steady state.
+
+    Each message is chunked independently, i.e., by a new chunker.
+
+    Example:
+        >>> with ProcessChunkerPool(RabinKarpCDC(48, 0), 4096) as pool:
+        ...     for boundaries in pool.map(messages):
+        ...         pass
+    """
+
+    __slots__ = ('_processes', '_executor', '_lock', '_free_segments', '_segments')
+
+    def __init__(self, chunking_strategy, chunk_size, processes=None):
+        """
+        Args:
+            chunking_strategy (BaseChunkingStrategy): The chunking strategy, which must be picklable.
+            chunk_size (int): The (expected) target chunk size.
+            processes (Optional[int]): Number of worker processes, defaults to the number of CPUs.
+        """
+        self._processes = processes or os.cpu_count() or 1
+        self._executor = concurrent.futures.ProcessPoolExecutor(self._processes, initializer=_initialize_worker,
+                                                                initargs=(chunking_strategy, chunk_size))
+        self._lock = threading.Lock()
+        self._free_segments = collections.defaultdict(list)  # free segments by size
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, buf):
+        """Schedules chunking of a message.
+
+        Args:
+            buf (bytes): The message that is to be chunked.
+
+        Returns:
+            concurrent.futures.Future: A future resolving to an `array.array` of chunk boundary positions.
+        """
+        length = len(buf)
+
+        # segment sizes are powers of two, so that segments can be reused for messages of similar length
+        size = _MIN_SEGMENT_SIZE
+        while size < length:
+            size *= 2
+
+        segment = self._acquire_segment(size)
+        segment.buf[:length] = buf
+        with self._lock:
+            # worker processes are forked on demand by the executor, which must not happen while another thread
+            # creates a segment, as the lock of the resource tracker would remain locked in the new worker
+            future = self._executor.submit(_chunk_segment, segment.name, length)
+        future.add_done_callback(lambda _: self._release_segment(size, segment))
+        return future
+
+    def map(self, buffers, max_pending=None):
+        """Chunks multiple messages.
+
+        Args:
+            buffers (iterable): The messages that are to be chunked.
+            max_pending (Optional[int]): Maximum number of messages held in shared memory at any time, defaults to twice
+                the number of worker processes.
+
+        Yields:
+            array.array: Chunk boundary positions for each message, in order.
+        """
+        max_pending = max_pending or 2 * self._processes
+        pending = collections.deque()
+        for buf in buffers:
+            pending.append(self.submit(buf))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        """Shuts down the worker processes and frees all shared memory segments."""
+        self._executor.shutdown()
+        with self._lock:
+            segments, self._segments = self._segments, []
+            self._free_segments.clear()
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    def _acquire_segment(self, size):
+        with self._lock:
+            if self._free_segments[size]:
+                return self._free_segments[size].pop()
+            segment = shared_memory.SharedMemory(create=True, size=size)
+            self._segments.append(segment)
+            return segment
+
+    def _release_segment(self, size, segment):
+        with self._lock:
+            self._free_segments[size].append(segment)
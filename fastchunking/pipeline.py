@@ -0,0 +1,284 @@
+"""Pipelines processing the chunks of binary streams.
+
+* :class:`.ReadAheadReader`: Reads a binary stream into a ring of buffers on a background thread.
+
+* :func:`.iter_chunk_boundaries`: Determines the chunk boundaries of a binary stream using a :class:`.BaseChunker`.
+
+* :func:`.iter_chunks`: Splits a binary stream into chunks using a :class:`.BaseChunker`.
+
+* :class:`.CompressionPipeline`: Chunks a binary stream and compresses the chunks in parallel.
+"""
+import collections
+import concurrent.futures
+import os
+import queue
+import threading
+import time
+import zlib
+
+# block size used when reading streams
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# number of buffers used when reading streams, i.e., one buffer is read while the other one is processed
+DEFAULT_BUFFER_COUNT = 2
+
+
+class ReadAheadReader(object):
+    """Reads a binary stream into a ring of preallocated buffers on a background thread.
+
+    While the consumer processes a block of the stream, the following blocks are read concurrently, so that neither I/O
+    nor processing (e.g., chunking, which releases the GIL) has to wait for the other one. This is particularly useful
+    for streams that cannot be memory-mapped, e.g., pipes or sockets.
+
+    Blocks are read using `readinto` (if supported by the stream), so no memory is allocated in a steady state.
+
+    Example:
+        >>> with ReadAheadReader(sys.stdin.buffer) as reader:
+        ...     for block in reader:
+        ...         chunker.next_chunk_boundaries(block)
+    """
+
+    __slots__ = ('_stream', '_buffers', '_free_buffers', '_filled_buffers', '_closed', '_thread')
+
+    def __init__(self, stream, buffer_size=DEFAULT_BLOCK_SIZE, buffer_count=DEFAULT_BUFFER_COUNT):
+        """
+        Args:
+            stream: A binary file-like object providing a `readinto` or `read` method.
+            buffer_size (Optional[int]): Size of each buffer, i.e., maximum size of the blocks in which the stream is
+                read.
+            buffer_count (Optional[int]): Number of buffers, i.e., up to `buffer_count - 1` blocks are read ahead.
+        """
+        if buffer_count < 1:
+            raise ValueError('at least one buffer is required')
+        self._stream = stream
+        self._buffers = [memoryview(bytearray(buffer_size)) for _ in range(buffer_count)]
+        self._free_buffers = queue.Queue()
+        for index in range(buffer_count):
+            self._free_buffers.put(index)
+        self._filled_buffers = queue.Queue()
+        self._closed = threading.Event()
+
+        # daemon thread, as reading from a stream cannot be interrupted
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        """Iterates over the blocks of the stream.
+
+        Iteration stops once the reader has been closed.
+
+        Yields:
+            memoryview: The next block of the stream, which is only valid until the next block is requested.
+
+        Raises:
+            Exception: Any exception raised while reading the stream.
+        """
+        while not self._closed.is_set():
+            item = self._filled_buffers.get()
+            if isinstance(item, BaseException):
+                raise item
+            index, length = item
+            if not length:
+                return
+            with self._buffers[index][:length] as block:
+                yield block
+            self._free_buffers.put(index)
+
+    def close(self):
+        """Stops reading the stream (after the current block has been read).
+
+        No further blocks are read, even if free buffers are available, so that the remaining content of the stream is
+        not consumed.
+        """
+        self._closed.set()
+        self._free_buffers.put(None)  # wakes up the reading thread if it is waiting for a free buffer
+
+    def _read(self):
+        readinto = getattr(self._stream, 'readinto', None)
+        try:
+            while True:
+                index = self._free_buffers.get()
+                if index is None or self._closed.is_set():
+                    # wakes up a consumer waiting for a filled buffer
+                    self._filled_buffers.put((None, 0))
+                    return
+                buf = self._buffers[index]
+                if readinto is not None:
+                    length = readinto(buf) or 0
+                else:
+                    block = self._stream.read(len(buf))
+                    length = len(block)
+                    buf[:length] = block
+                self._filled_buffers.put((index, length))
+                if not length:
+                    return
+        except BaseException as e:
+            self._filled_buffers.put(e)
+
+
+def iter_chunk_boundaries(stream, chunker, block_size=DEFAULT_BLOCK_SIZE, buffer_count=DEFAULT_BUFFER_COUNT):
+    """Determines the chunk boundaries of the content of a binary stream, reading ahead using a
+    :class:`.ReadAheadReader`.
+
+    Args:
+        stream: A binary file-like object providing a `readinto` or `read` method.
+        chunker (BaseChunker): The chunker determining the chunk boundaries.
+        block_size (Optional[int]): Size of the blocks in which the stream is read.
+        buffer_count (Optional[int]): Number of buffers used for reading ahead.
+
+    Yields:
+        int: The chunk boundary positions, relative to the beginning of the stream.
+    """
+    offset = 0
+    with ReadAheadReader(stream, block_size, buffer_count) as reader:
+        for block in reader:
+            for boundary in chunker.next_chunk_boundaries(block):
+                yield offset + boundary
+            offset += len(block)
+
+
+def iter_chunks(stream, chunker, block_size=DEFAULT_BLOCK_SIZE, buffer_count=DEFAULT_BUFFER_COUNT):
+    """Splits the content of a binary stream into chunks, reading ahead using a :class:`.ReadAheadReader`.
+
+    Args:
+        stream: A binary file-like object providing a `readinto` or `read` method.
+        chunker (BaseChunker): The chunker determining the chunk boundaries.
+        block_size (Optional[int]): Size of the blocks in which the stream is read.
+        buffer_count (Optional[int]): Number of buffers used for reading ahead.
+
+    Yields:
+        bytes: The chunks of the stream content. The last chunk ends at the end of the stream, which is not necessarily
+            a chunk boundary.
+    """
+    pending = bytearray()  # content of the current chunk read so far, i.e., carried over from previous blocks
+    with ReadAheadReader(stream, block_size, buffer_count) as reader:
+        for block in reader:
+            position = 0
+            for boundary in chunker.next_chunk_boundaries(block):
+                if pending:
+                    pending += block[position:boundary]
+                    yield bytes(pending)
+                    pending = bytearray()
+                else:
+                    yield bytes(block[position:boundary])
+                position = boundary
+            pending += block[position:]
+
+    if pending:
+        yield bytes(pending)
+
+
+class StageStats(object):
+    """Throughput counters of a single pipeline stage."""
+
+    __slots__ = ('items', 'bytes_in', 'bytes_out', 'seconds')
+
+    def __init__(self):
+        self.items = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def add(self, bytes_in, bytes_out, seconds):
+        """Accounts for a single item processed by the stage."""
+        self.items += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.seconds += seconds
+
+    @property
+    def throughput(self):
+        """float: Input bytes processed per second spent in this stage."""
+        return self.bytes_in / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return '{}(items={}, bytes_in={}, bytes_out={}, seconds={:f})'.format(
+            type(self).__name__, self.items, self.bytes_in, self.bytes_out, self.seconds)
+
+
+class CompressionPipeline(object):
+    """Chunks a binary stream and compresses the chunks in parallel.
+
+    Chunking is performed by the thread consuming the pipeline output, while chunks are compressed by a bounded pool of
+    worker threads. As the compression functions of :mod:`zlib`, :mod:`lzma` and :mod:`bz2` release the GIL, this allows
+    to use multiple cores. Compressed chunks are output in order.
+
+    At most `max_pending` chunks are held by the pipeline at any time: If the output is not consumed, chunking stops
+    (backpressure), so memory consumption is bounded.
+
+    Attributes:
+        chunking_stats (StageStats): Counters of the chunking stage (including reading the stream).
+        compression_stats (StageStats): Counters of the compression stage. Time is summed up over all workers.
+    """
+
+    __slots__ = ('_chunker', '_compress', '_workers', '_max_pending', '_block_size', 'chunking_stats',
+                 'compression_stats')
+
+    def __init__(self, chunker, compress=zlib.compress, workers=None, max_pending=None,
+                 block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            chunker (BaseChunker): The chunker determining the chunk boundaries.
+            compress (Optional[callable]): Compression function mapping a chunk to its compressed representation, e.g.,
+                :func:`zlib.compress`, :func:`lzma.compress` or :func:`bz2.compress`.
+            workers (Optional[int]): Number of worker threads, defaults to the number of CPUs.
+            max_pending (Optional[int]): Maximum number of chunks held by the pipeline, defaults to twice the number of
+                workers.
+            block_size (Optional[int]): Size of the blocks in which the stream is read.
+        """
+        self._chunker = chunker
+        self._compress = compress
+        self._workers = workers or os.cpu_count() or 1
+        self._max_pending = max_pending or 2 * self._workers
+        self._block_size = block_size
+        self.chunking_stats = StageStats()
+        self.compression_stats = StageStats()
+
+    def run(self, stream):
+        """Chunks and compresses the content of `stream`.
+
+        Args:
+            stream: A binary file-like object providing a `read` method.
+
+        Yields:
+            bytes: The compressed chunks, in order.
+        """
+        chunks = iter_chunks(stream, self._chunker, self._block_size)
+        with concurrent.futures.ThreadPoolExecutor(self._workers) as executor:
+            pending = collections.deque()
+            try:
+                while True:
+                    # chunking stage
+                    start_time = time.perf_counter()
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    self.chunking_stats.add(len(chunk), len(chunk), time.perf_counter() - start_time)
+
+                    # compression stage
+                    pending.append(executor.submit(self._compress_chunk, chunk))
+                    if len(pending) >= self._max_pending:
+                        yield self._pop_result(pending)
+
+                while pending:
+                    yield self._pop_result(pending)
+            finally:
+                # do not compress chunks that will never be consumed
+                for future in pending:
+                    future.cancel()
+
+    def _compress_chunk(self, chunk):
+        start_time = time.perf_counter()
+        compressed_chunk = self._compress(chunk)
+        return len(chunk), compressed_chunk, time.perf_counter() - start_time
+
+    def _pop_result(self, pending):
+        chunk_length, compressed_chunk, seconds = pending.popleft().result()
+        self.compression_stats.add(chunk_length, len(compressed_chunk), seconds)
+        return compressed_chunk
@@ -0,0 +1,320 @@
+"""Persistent content-addressed chunk storage.
+
+* :class:`.ChunkStore`: Stores unique chunks in packfiles, indexed by their SHA-256 fingerprints.
+"""
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import struct
+
+from fastchunking.pipeline import DEFAULT_BLOCK_SIZE, iter_chunks
+
+# index runs are named after the range of flushes whose entries they contain
+_INDEX_FILE_NAME = 'index-{:08d}-{:08d}'
+_INDEX_FILE_NAME_PATTERN = re.compile(r'^index-(\d{8})-(\d{8})$')
+_INDEX_MAGIC = b'FCIDX\0\0\1'
+# index record: fingerprint, pack number, offset within pack, chunk length
+_INDEX_RECORD = struct.Struct('>32sIQI')
+
+_PACK_FILE_NAME = 'pack-{:08d}.dat'
+_PACK_FILE_NAME_PATTERN = re.compile(r'^pack-(\d{8})\.dat$')
+
+
+class ChunkStore(object):
+    """Content-addressed chunk store.
+
+    Unique chunks are appended to large packfiles, so storing many small chunks does not require many files. Chunks
+    are identified by their SHA-256 fingerprints, which are kept in index files (runs) of fixed-size records, sorted by
+    fingerprint. Runs are memory-mapped and searched using binary search, i.e., they are not loaded into memory.
+
+    Writes are batched: Chunks are buffered in memory, and both packfiles and the index are only updated (and synced to
+    disk) on :meth:`.flush`, which is also called when the store is closed. Each flush writes the new entries as a new
+    run, and runs of similar size are merged, so that the number of runs grows only logarithmically with the number of
+    chunks, while each entry is rewritten only a logarithmic number of times. Chunks that have not been flushed are
+    lost on a crash, but already flushed chunks are never affected.
+
+    Example:
+        >>> with ChunkStore('chunks') as store:
+        ...     fingerprints = store.put_stream(open('file', 'rb'), RabinKarpCDC(48, 0).create_chunker(4096))
+        ...     content = b''.join(map(store.get, fingerprints))
+    """
+
+    __slots__ = ('_path', '_max_pack_size', '_write_buffer_size', '_max_pending_entries', '_index_runs',
+                 '_pending_entries', '_pack_number', '_pack_file', '_pack_size', '_write_buffer',
+                 '_write_buffer_offset', '_pack_readers', '_closed')
+
+    def __init__(self, path, max_pack_size=1024 * 1024 * 1024, write_buffer_size=4 * 1024 * 1024,
+                 max_pending_entries=65536):
+        """
+        Args:
+            path (str): Directory containing the store, which is created if it does not exist.
+            max_pack_size (Optional[int]): Size of packfiles (in bytes) above which a new packfile is started.
+            write_buffer_size (Optional[int]): Size of the buffer (in bytes) in which chunks are collected before they
+                are written to the current packfile.
+            max_pending_entries (Optional[int]): Number of new chunks after which the store is flushed automatically.
+        """
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._max_pack_size = max_pack_size
+        self._write_buffer_size = write_buffer_size
+        self._max_pending_entries = max_pending_entries
+
+        # index runs of flushed chunks (ordered by flushes), and locations of new chunks
+        self._index_runs = []
+        self._pending_entries = {}
+        self._open_index()
+
+        # continue writing the most recent packfile
+        pack_numbers = [int(match.group(1)) for match in map(_PACK_FILE_NAME_PATTERN.match, os.listdir(path)) if match]
+        self._pack_number = max(pack_numbers, default=0)
+        self._pack_file = open(self._pack_path(self._pack_number), 'ab')
+        self._pack_size = self._pack_file.seek(0, os.SEEK_END)
+        self._write_buffer = bytearray()
+        self._write_buffer_offset = self._pack_size
+        self._pack_readers = {}
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, fingerprint):
+        return self._locate(fingerprint) is not None
+
+    def __len__(self):
+        return sum(len(index_run) for index_run in self._index_runs) + len(self._pending_entries)
+
+    def put(self, chunk):
+        """Stores a chunk unless it is already contained in the store.
+
+        Args:
+            chunk (bytes): The chunk.
+
+        Returns:
+            bytes: The fingerprint of the chunk.
+        """
+        fingerprint = hashlib.sha256(chunk).digest()
+        if fingerprint in self:
+            return fingerprint
+
+        # start a new packfile if the current one is full
+        if self._pack_size and self._pack_size + len(chunk) > self._max_pack_size:
+            self._write_pack()
+            self._pack_file.close()
+            self._pack_number += 1
+            self._pack_file = open(self._pack_path(self._pack_number), 'ab')
+            self._pack_size = self._write_buffer_offset = 0
+
+        self._pending_entries[fingerprint] = (self._pack_number, self._pack_size, len(chunk))
+        self._write_buffer += chunk
+        self._pack_size += len(chunk)
+
+        if len(self._write_buffer) >= self._write_buffer_size:
+            self._write_pack(sync=False)
+        if len(self._pending_entries) >= self._max_pending_entries:
+            self.flush()
+
+        return fingerprint
+
+    def put_stream(self, stream, chunker, block_size=DEFAULT_BLOCK_SIZE):
+        """Splits the content of a binary stream into chunks and stores them.
+
+        Args:
+            stream: A binary file-like object providing a `read` method.
+            chunker (BaseChunker): The chunker determining the chunk boundaries.
+            block_size (Optional[int]): Size of the blocks in which the stream is read.
+
+        Returns:
+            list: The fingerprints of all chunks of the stream, in order.
+        """
+        return [self.put(chunk) for chunk in iter_chunks(stream, chunker, block_size)]
+
+    def get(self, fingerprint):
+        """Retrieves a chunk.
+
+        Args:
+            fingerprint (bytes): The fingerprint of the chunk.
+
+        Returns:
+            bytes: The chunk.
+
+        Raises:
+            KeyError: If the store does not contain a chunk with the given fingerprint.
+        """
+        location = self._locate(fingerprint)
+        if location is None:
+            raise KeyError(fingerprint)
+        pack_number, offset, length = location
+
+        # chunk has not been written yet
+        if pack_number == self._pack_number and offset >= self._write_buffer_offset:
+            offset -= self._write_buffer_offset
+            return bytes(self._write_buffer[offset:offset + length])
+
+        pack_reader = self._pack_readers.get(pack_number)
+        if pack_reader is None:
+            pack_reader = self._pack_readers[pack_number] = open(self._pack_path(pack_number), 'rb')
+        pack_reader.seek(offset)
+        return pack_reader.read(length)
+
+    def flush(self):
+        """Writes all new chunks to disk and adds them to the index."""
+        self._write_pack()
+        if not self._pending_entries:
+            return
+
+        # write the new entries as a new run
+        flush_number = self._index_runs[-1].last + 1 if self._index_runs else 0
+        pending_records = sorted((fingerprint,) + location for fingerprint, location in self._pending_entries.items())
+        self._index_runs.append(self._write_index_run(flush_number, flush_number, pending_records))
+        self._pending_entries.clear()
+
+        # merge the most recent runs as long as the newer one is at least half as large as the older one
+        while len(self._index_runs) > 1 and 2 * len(self._index_runs[-1]) >= len(self._index_runs[-2]):
+            older_run, newer_run = self._index_runs[-2:]
+            self._index_runs[-2:] = [self._write_index_run(older_run.first, newer_run.last,
+                                                           heapq.merge(older_run, newer_run))]
+            older_run.close()
+            newer_run.close()
+            os.remove(older_run.path)
+            os.remove(newer_run.path)
+
+    def close(self):
+        """Flushes the store and releases all resources. Closing an already closed store has no effect."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._close_index()
+        self._pack_file.close()
+        for pack_reader in self._pack_readers.values():
+            pack_reader.close()
+        self._pack_readers.clear()
+
+    def _pack_path(self, pack_number):
+        return os.path.join(self._path, _PACK_FILE_NAME.format(pack_number))
+
+    def _write_pack(self, sync=True):
+        """Writes the write buffer to the current packfile."""
+        if self._write_buffer:
+            self._pack_file.write(self._write_buffer)
+            self._write_buffer = bytearray()
+            self._write_buffer_offset = self._pack_size
+        self._pack_file.flush()
+        if sync:
+            os.fsync(self._pack_file.fileno())
+
+    def _locate(self, fingerprint):
+        """Determines the location (pack number, offset, length) of a chunk, or None if it is unknown."""
+        location = self._pending_entries.get(fingerprint)
+        if location is not None:
+            return location
+
+        # runs are disjoint, as chunks are only added if they are not contained in the store
+        for index_run in self._index_runs:
+            location = index_run.locate(fingerprint)
+            if location is not None:
+                return location
+        return None
+
+    def _write_index_run(self, first, last, records):
+        """Writes a run containing the entries of the given range of flushes, replacing any existing file atomically."""
+        index_path = os.path.join(self._path, _INDEX_FILE_NAME.format(first, last))
+        new_index_path = index_path + '.new'
+        with open(new_index_path, 'wb') as new_index_file:
+            new_index_file.write(_INDEX_MAGIC)
+            for record in records:
+                new_index_file.write(_INDEX_RECORD.pack(*record))
+            new_index_file.flush()
+            os.fsync(new_index_file.fileno())
+        os.replace(new_index_path, index_path)
+        _fsync_directory(self._path)
+        return _IndexRun(index_path, first, last)
+
+    def _open_index(self):
+        flush_ranges = sorted(((int(match.group(1)), int(match.group(2))) for match in
+                               map(_INDEX_FILE_NAME_PATTERN.match, os.listdir(self._path)) if match),
+                              key=lambda flush_range: (flush_range[0], -flush_range[1]))
+        for first, last in flush_ranges:
+            index_path = os.path.join(self._path, _INDEX_FILE_NAME.format(first, last))
+            if self._index_runs and last <= self._index_runs[-1].last:
+                # left over by an interrupted merge, whose result contains all entries of this run
+                os.remove(index_path)
+                continue
+            try:
+                self._index_runs.append(_IndexRun(index_path, first, last))
+            except ValueError:
+                self._close_index()
+                raise
+
+    def _close_index(self):
+        for index_run in self._index_runs:
+            index_run.close()
+        self._index_runs = []
+
+
+class _IndexRun(object):
+    """Memory-mapped, sorted index file, containing the entries added by a range of flushes."""
+
+    __slots__ = ('path', 'first', 'last', '_file', '_map', '_count')
+
+    def __init__(self, path, first, last):
+        self.path = path
+        self.first = first
+        self.last = last
+        self._file = open(path, 'rb')
+        self._map = None
+        if self._file.read(len(_INDEX_MAGIC)) != _INDEX_MAGIC:
+            self._file.close()
+            raise ValueError('{} is not a chunk store index'.format(path))
+
+        self._count = (os.fstat(self._file.fileno()).st_size - len(_INDEX_MAGIC)) // _INDEX_RECORD.size
+        if self._count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for offset in range(len(_INDEX_MAGIC), len(_INDEX_MAGIC) + self._count * _INDEX_RECORD.size,
+                            _INDEX_RECORD.size):
+            yield _INDEX_RECORD.unpack_from(self._map, offset)
+
+    def locate(self, fingerprint):
+        """Determines the location (pack number, offset, length) of a chunk using binary search, or returns None."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = len(_INDEX_MAGIC) + middle * _INDEX_RECORD.size
+            middle_fingerprint = self._map[offset:offset + 32]
+            if middle_fingerprint < fingerprint:
+                low = middle + 1
+            elif middle_fingerprint > fingerprint:
+                high = middle
+            else:
+                return _INDEX_RECORD.unpack_from(self._map, offset)[1:]
+        return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def _fsync_directory(path):
+    """Syncs a directory to disk, so that renamed files are persisted (if supported by the platform)."""
+    try:
+        directory_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
@@ -1,9 +1,35 @@
+import io
+import itertools
+import mmap
 import os
+import random
+import socket
 import sys
+import tempfile
+import threading
 import unittest
+import unittest.mock
+import zlib
 
 sys.path.insert(0, os.path.abspath('..'))
 import fastchunking
+import fastchunking.cache
+import fastchunking.codec
+import fastchunking.estimate
+import fastchunking.parallel
+import fastchunking.pipeline
+import fastchunking.store
+
+
+def create_sparse_file(test_case, content_parts, hole_size):
+    """Creates a temporary file containing the given content parts, separated by holes of the given size."""
+    with tempfile.NamedTemporaryFile(delete=False) as file_:
+        test_case.addCleanup(os.remove, file_.name)
+        for content_part in content_parts:
+            file_.write(content_part)
+            file_.seek(hole_size, os.SEEK_CUR)
+        file_.truncate()
+    return file_.name, (b'\0' * hole_size).join(content_parts) + b'\0' * hole_size
 
 
 class StaticChunkingTests(unittest.TestCase):
@@ -73,6 +99,24 @@ class StaticChunkingTests(unittest.TestCase):
 
             self.assertEqual(list(boundaries), list(map(lambda x: x + 1, prepend_boundaries)))
 
+    def test_find_next_boundary(self):
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10), 4)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10, 4), 8)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10, 8), None)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10, 0, 1), None)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10, 0, 3), 1)
+        self.assertEqual(list(chunker.next_chunk_boundaries(b'0' * 10)), [4, 8])
+
+    def test_file(self):
+        file_name, content = create_sparse_file(self, [os.urandom(1000), os.urandom(3000)], 1024 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        boundaries = chunker.next_chunk_boundaries(content)
+
+        file_chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        self.assertEqual(file_chunker.next_chunk_boundaries_file(file_name), list(boundaries))
+
 
 class RabinKarpTests(unittest.TestCase):
 
@@ -114,6 +158,182 @@ class RabinKarpTests(unittest.TestCase):
 
             self.assertEqual(list(boundaries), list(map(lambda x: x + 1, prepend_boundaries)))
 
+    def test_find_next_boundary(self):
+        content = os.urandom(1024 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        boundaries = list(chunker.next_chunk_boundaries(content))
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        found_boundaries = []
+        boundary = chunker.find_next_boundary(content)
+        while boundary is not None:
+            found_boundaries.append(boundary)
+            boundary = chunker.find_next_boundary(content, boundary)
+
+        self.assertEqual(found_boundaries, boundaries)
+
+    def test_find_next_boundary_consistent_chunking(self):
+        content = os.urandom(64 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        boundaries = list(chunker.next_chunk_boundaries(content + content))
+
+        # consume content partially, then continue with regular chunking
+        chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        found_boundaries = []
+        boundary = chunker.find_next_boundary(content, 0, 1000)
+        while boundary is not None:
+            found_boundaries.append(boundary)
+            boundary = chunker.find_next_boundary(content, boundary, 1000)
+        found_boundaries.extend(boundary + 1000 for boundary in chunker.next_chunk_boundaries(content[1000:] + content))
+
+        self.assertEqual(found_boundaries, boundaries)
+
+    def test_file(self):
+        file_name, content = create_sparse_file(self, [os.urandom(10000), os.urandom(300000), b''], 3 * 1024 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        boundaries = chunker.next_chunk_boundaries(content)
+
+        file_chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        self.assertEqual(file_chunker.next_chunk_boundaries_file(file_name, block_size=4096), list(boundaries))
+
+        # chunk from the current position of a file object
+        chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        boundaries = chunker.next_chunk_boundaries(content[5000:])
+
+        file_chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        with open(file_name, 'rb') as file_:
+            file_.seek(5000)
+            self.assertEqual(file_chunker.next_chunk_boundaries_file(file_), list(boundaries))
+
+        # file-like objects not backed by an OS file
+        file_chunker = self.chunking_strategy.create_chunker(chunk_size=128)
+        stream = io.BytesIO(content)
+        stream.seek(5000)
+        self.assertEqual(file_chunker.next_chunk_boundaries_file(stream, block_size=4096), list(boundaries))
+
+    @unittest.skipUnless(sys.maxsize > 2 ** 32, 'requires a 64-bit platform')
+    def test_large_buffer(self):
+        # content following more than 4 GiB of zeros, i.e., boundary positions do not fit into 32 bits
+        content = os.urandom(64 * 1024)
+        offset = 2 ** 32 + 1000
+        expected = [offset + boundary for boundary in
+                    self.chunking_strategy.create_chunker(chunk_size=4096).next_chunk_boundaries(content, 48)]
+        self.assertTrue(expected)
+
+        # the whole (sparse, i.e., mostly unallocated) mapping is chunked using a single call
+        with mmap.mmap(-1, offset + len(content)) as mapping:
+            mapping[offset:] = content
+            chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+            self.assertEqual(list(chunker.next_chunk_boundaries(mapping)), expected)
+            chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+            self.assertEqual(chunker.find_next_boundary(mapping), expected[0])
+
+        # a hole of more than 4 GiB is passed to the C++ extension at once
+        with tempfile.NamedTemporaryFile(delete=False) as file_:
+            self.addCleanup(os.remove, file_.name)
+            file_.seek(offset)
+            file_.write(content)
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        self.assertEqual(chunker.next_chunk_boundaries_file(file_.name), expected)
+
+    def test_runs_of_identical_bytes(self):
+        content = (b"Lorem ipsum dolor sit amet, consetetur sadipscing elitr" + b"\0" * 100 + b"f" * 60 +
+                   b"Stet clita kasd gubergren" + b"a" * 100 + b"At vero eos et accusam")
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=16)
+        boundaries = chunker.next_chunk_boundaries(content)
+
+        self.assertEqual(list(boundaries),
+                         [48, 50, 53, 62, 64, 65, 68, 159, 164, 203, 204, 205, 206, 207, 208, 209, 210, 211, 212, 213,
+                          214, 215, 266, 271, 342, 344, 349])
+
+        chunker = self.chunking_strategy.create_multilevel_chunker([16, 32, 64])
+        boundaries_with_levels = chunker.next_chunk_boundaries_levels(content)
+
+        self.assertEqual(list(boundaries_with_levels),
+                         [(48, 1), (50, 2), (53, 0), (62, 0), (64, 0), (65, 2), (68, 0), (159, 0), (164, 1), (168, 0),
+                          (203, 1), (204, 1), (205, 1), (206, 1), (207, 1), (208, 1), (209, 1), (210, 1), (211, 1),
+                          (212, 1), (213, 1), (214, 1), (215, 1), (266, 2), (269, 1), (274, 0), (342, 0), (344, 0),
+                          (349, 1), (355, 0)])
+
+    def test_super_features(self):
+        content = random.Random(0).getrandbits(8 * 256 * 1024).to_bytes(256 * 1024, 'little')
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        boundaries = list(chunker.next_chunk_boundaries(content))
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096, super_features=3)
+        feature_boundaries, features = chunker.next_chunk_boundaries_with_features(content[:100000])
+        more_feature_boundaries, more_features = chunker.next_chunk_boundaries_with_features(content[100000:])
+
+        self.assertEqual(feature_boundaries + [boundary + 100000 for boundary in more_feature_boundaries], boundaries)
+        self.assertEqual(len(features), 3 * len(feature_boundaries))
+        self.assertEqual(len(more_features), 3 * len(more_feature_boundaries))
+
+        # similar chunks share super-features
+        chunk = content[boundaries[0]:boundaries[1]]
+        modified_chunk = chunk[:100] + bytes([chunk[100] ^ 1]) + chunk[101:]
+        chunk_features = []
+        for message in (content[:boundaries[0]] + chunk, content[:boundaries[0]] + modified_chunk):
+            chunker = self.chunking_strategy.create_chunker(chunk_size=4096, super_features=3)
+            _, features = chunker.next_chunk_boundaries_with_features(message)
+            chunk_features.append(set(features[3:6]))
+        self.assertTrue(chunk_features[0] & chunk_features[1])
+
+        with self.assertRaises(TypeError):
+            chunker.find_next_boundary(content)
+        for super_features, features_per_super_feature in ((-1, 4), (3, 0), (3, -2)):
+            with self.assertRaises(ValueError):
+                self.chunking_strategy.create_chunker(4096, super_features, features_per_super_feature)
+
+    def test_delimiter(self):
+        generator = random.Random(0)
+        content = b''.join(b'%d,%x\n' % (i, generator.getrandbits(generator.randint(1, 400))) for i in range(10000))
+        content += b'x' * 5000 + b'\n'
+
+        chunking_strategy = fastchunking.RabinKarpCDC(48, 0, delimiter=b'\n', max_chunk_size=4000)
+        boundaries = list(chunking_strategy.create_chunker(chunk_size=512).next_chunk_boundaries(content))
+        self.assertGreater(len(boundaries), len(content) // 1024)
+
+        # all chunks are complete lines, except for those limited by the maximum chunk size
+        chunk_sizes = [end - start for start, end in zip([0] + boundaries, boundaries)]
+        self.assertLessEqual(max(chunk_sizes), 4000)
+        self.assertTrue(all(content[boundary - 1:boundary] == b'\n' or chunk_size == 4000
+                            for boundary, chunk_size in zip(boundaries, chunk_sizes)))
+        self.assertIn(4000, chunk_sizes)
+
+        # chunking in fragments and lazy chunking yield the same boundaries
+        chunker = chunking_strategy.create_chunker(chunk_size=512)
+        self.assertEqual(list(chunker.next_chunk_boundaries(content[:10000])) +
+                         [10000 + boundary for boundary in chunker.next_chunk_boundaries(content[10000:])], boundaries)
+        chunker = chunking_strategy.create_chunker(chunk_size=512)
+        lazy_boundaries = [chunker.find_next_boundary(content)]
+        while lazy_boundaries[-1] is not None:
+            lazy_boundaries.append(chunker.find_next_boundary(content, lazy_boundaries[-1]))
+        self.assertEqual(lazy_boundaries[:-1], boundaries)
+
+        # chunk boundaries depend on content rather than on offsets
+        shifted_boundaries = chunking_strategy.create_chunker(chunk_size=512).next_chunk_boundaries(b'0\n' + content)
+        self.assertGreater(len(set(boundaries) & set(boundary - 2 for boundary in shifted_boundaries)),
+                           len(boundaries) // 2)
+
+        # multi-level chunkers combine independent chunkers
+        multilevel_chunker = chunking_strategy.create_multilevel_chunker([512, 2048])
+        self.assertTrue(set(boundary for boundary, _ in multilevel_chunker.next_chunk_boundaries_levels(content))
+                        >= set(boundaries))
+
+        with self.assertRaises(ValueError):
+            chunking_strategy.create_chunker(chunk_size=512, super_features=4)
+        with self.assertRaises(ValueError):
+            fastchunking.RabinKarpCDC(48, 0, delimiter=b'\r\n')
+        with self.assertRaises(ValueError):
+            fastchunking.RabinKarpCDC(48, 0, delimiter='\n')
+        with self.assertRaises(ValueError):
+            fastchunking.RabinKarpCDC(48, 0, max_chunk_size=4000)
+
     def test_sample_data_1(self):
         content = ("Lorem ipsum dolor sit amet, consetetur sadipscing elitr, sed diam nonumy eirmod tempor invidunt ut "
                    "labore et dolore magna aliquyam erat, sed diam voluptua. At vero eos et accusam et justo duo "
@@ -164,6 +384,639 @@ class RabinKarpTests(unittest.TestCase):
                           (410, 2), (437, 0), (443, 0), (459, 1), (463, 0), (466, 2), (474, 1), (492, 2), (497, 2),
                           (501, 1), (522, 2), (532, 1), (545, 1), (577, 0), (597, 0), (598, 2), (606, 0)])
 
+        chunker = self.chunking_strategy.create_multilevel_chunker([])
+        self.assertEqual(list(chunker.next_chunk_boundaries_levels(content.encode('ascii'), 5)), [])
+
+
+try:
+    import fastchunking._rabinkarpnp
+except ImportError:  # NumPy is not available
+    pass
+
+
+@unittest.skipUnless(hasattr(fastchunking, '_rabinkarpnp'), 'requires NumPy')
+class NumPyRabinKarpTests(RabinKarpTests):
+    """Runs all Rabin-Karp tests using the NumPy implementation of the rolling hash instead of the C++ extension."""
+
+    def setUp(self):
+        self.native_module = fastchunking._rabinkarprh
+        patcher = unittest.mock.patch.object(fastchunking, '_rabinkarprh', fastchunking._rabinkarpnp)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_large_buffer(self):
+        self.skipTest('too slow for the NumPy implementation')
+
+    def test_same_results_as_extension(self):
+        if self.native_module is fastchunking._rabinkarpnp:
+            self.skipTest('requires the C++ extension')
+
+        content = (random.Random(0).getrandbits(8 * 64 * 1024).to_bytes(64 * 1024, 'little') + b'\0' * 100 +
+                   b'ab' * 1000)
+        for prepend_bytes in (0, 1, 5, 48):
+            results = []
+            for module in (fastchunking._rabinkarpnp, self.native_module):
+                rolling_hash = module.RabinKarpMultiThresholdHash(48, 0, [1.0 / 16, 1.0 / 64, 1.0 / 256])
+                results.append(list(rolling_hash.next_chunk_boundaries_with_thresholds(content, prepend_bytes)) +
+                               list(rolling_hash.next_chunk_boundaries_with_thresholds(content, prepend_bytes)))
+            self.assertEqual(results[0], results[1])
+
+
+class AsymmetricExtremumTests(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(AsymmetricExtremumTests, self).__init__(*args, **kwargs)
+        self.chunking_strategy = fastchunking.AsymmetricExtremumCDC()
+
+    def test_consistent_chunking(self):
+        content = os.urandom(1024 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        boundaries = list(chunker.next_chunk_boundaries(content))
+
+        # chunk content in parts
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        part_boundaries = []
+        for offset in range(0, len(content), 10000):
+            part_boundaries.extend(offset + boundary
+                                   for boundary in chunker.next_chunk_boundaries(content[offset:offset + 10000]))
+
+        self.assertEqual(part_boundaries, boundaries)
+
+    def test_prepending(self):
+        for _ in range(256):
+            content = os.urandom(1024)
+
+            chunker = self.chunking_strategy.create_chunker(chunk_size=64)
+            boundaries = chunker.next_chunk_boundaries(b'\0' * 3 + content)
+
+            prepend_chunker = self.chunking_strategy.create_chunker(chunk_size=64)
+            prepend_boundaries = prepend_chunker.next_chunk_boundaries(content, 3)
+
+            self.assertEqual([boundary for boundary in boundaries if boundary > 3],
+                             [boundary + 3 for boundary in prepend_boundaries])
+
+    def test_prepending_many_zeros(self):
+        content = os.urandom(1024)
+        for prefix in (b'', b'\xff' * 100, os.urandom(100)):
+            for prepend_bytes in (10000, 10001, 10007):
+                chunker = self.chunking_strategy.create_chunker(chunk_size=64)
+                chunker.next_chunk_boundaries(prefix)
+                boundaries = chunker.next_chunk_boundaries(b'\0' * prepend_bytes + content)
+
+                prepend_chunker = self.chunking_strategy.create_chunker(chunk_size=64)
+                prepend_chunker.next_chunk_boundaries(prefix)
+                prepend_boundaries = prepend_chunker.next_chunk_boundaries(content, prepend_bytes)
+
+                self.assertEqual([boundary for boundary in boundaries if boundary > prepend_bytes],
+                                 [boundary + prepend_bytes for boundary in prepend_boundaries])
+
+        # work does not depend on the number of zero bytes
+        chunker = self.chunking_strategy.create_chunker(chunk_size=64)
+        self.assertEqual(list(chunker.next_chunk_boundaries(b'', 1 << 62)), [])
+
+    def test_find_next_boundary(self):
+        content = os.urandom(256 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=256)
+        boundaries = list(chunker.next_chunk_boundaries(content, 5))
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=256)
+        chunker.next_chunk_boundaries(b'', 5)
+        found_boundaries = []
+        boundary = chunker.find_next_boundary(content, 0, 1000)
+        while boundary is not None:
+            found_boundaries.append(boundary)
+            boundary = chunker.find_next_boundary(content, boundary, 1000)
+        found_boundaries.extend(1000 + boundary for boundary in chunker.next_chunk_boundaries(content[1000:]))
+
+        self.assertEqual(found_boundaries, boundaries)
+
+    def test_chunk_sizes(self):
+        content = random.Random(0).getrandbits(8 * 4 * 1024 * 1024).to_bytes(4 * 1024 * 1024, 'little')
+
+        for chunk_size in (256, 4096):
+            chunker = self.chunking_strategy.create_chunker(chunk_size=chunk_size)
+            boundaries = list(chunker.next_chunk_boundaries(content))
+            self.assertAlmostEqual(boundaries[-1] / len(boundaries), chunk_size, delta=chunk_size * 0.1)
+
+    @unittest.skipUnless(hasattr(fastchunking, '_rabinkarpnp'), 'requires NumPy')
+    def test_numpy_engine(self):
+        content = os.urandom(256 * 1024) + b'\0' * 10000 + b'\xff' * 10000
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=1024)
+        boundaries = list(chunker.next_chunk_boundaries(content, 5))
+
+        def chunk_lazily():
+            # two boundaries found lazily, followed by regular chunking after many prepended zero bytes
+            chunker = self.chunking_strategy.create_chunker(chunk_size=1024)
+            first_boundary = chunker.find_next_boundary(content)
+            second_boundary = chunker.find_next_boundary(content, first_boundary)
+            return [first_boundary, second_boundary] + list(
+                chunker.next_chunk_boundaries(content[second_boundary:], 1 << 40))
+        lazy_boundaries = chunk_lazily()
+
+        with unittest.mock.patch.object(fastchunking, '_rabinkarprh', fastchunking._rabinkarpnp):
+            chunker = self.chunking_strategy.create_chunker(chunk_size=1024)
+            self.assertEqual(list(chunker.next_chunk_boundaries(content, 5)), boundaries)
+            self.assertEqual(chunk_lazily(), lazy_boundaries)
+
+
+class RapidAsymmetricMaximumTests(AsymmetricExtremumTests):
+
+    def __init__(self, *args, **kwargs):
+        super(RapidAsymmetricMaximumTests, self).__init__(*args, **kwargs)
+        self.chunking_strategy = fastchunking.RapidAsymmetricMaximumCDC()
+
+
+class ChunkerGroupTests(unittest.TestCase):
+
+    def _check_chunker_group(self, configurations):
+        content = os.urandom(200 * 1024)
+
+        group = fastchunking.ChunkerGroup(configurations)
+        group_boundaries = [group.next_chunk_boundaries(content[:1000], 7), group.next_chunk_boundaries(b'', 3),
+                            group.next_chunk_boundaries(content[1000:])]
+
+        for index, (chunking_strategy, chunk_size) in enumerate(configurations):
+            chunker = chunking_strategy.create_chunker(chunk_size)
+            self.assertEqual([boundaries[index] for boundaries in group_boundaries],
+                             [list(chunker.next_chunk_boundaries(content[:1000], 7)),
+                              list(chunker.next_chunk_boundaries(b'', 3)),
+                              list(chunker.next_chunk_boundaries(content[1000:]))])
+
+    def test_rabin_karp(self):
+        self._check_chunker_group([(fastchunking.RabinKarpCDC(48, 0), 1024), (fastchunking.RabinKarpCDC(32, 1), 256),
+                                   (fastchunking.RabinKarpCDC(48, 0), 4096)])
+
+    def test_mixed_configurations(self):
+        self._check_chunker_group([(fastchunking.SC(), 4096), (fastchunking.RabinKarpCDC(48, 0), 1024),
+                                   (fastchunking.RapidAsymmetricMaximumCDC(), 2048)])
+
+    def test_delimiter(self):
+        self._check_chunker_group([(fastchunking.RabinKarpCDC(48, 0, delimiter=b'\0'), 1024),
+                                   (fastchunking.RabinKarpCDC(48, 0), 1024)])
+
+    @unittest.skipUnless(hasattr(fastchunking, '_rabinkarpnp'), 'requires NumPy')
+    def test_numpy_engine(self):
+        with unittest.mock.patch.object(fastchunking, '_rabinkarprh', fastchunking._rabinkarpnp):
+            self.test_rabin_karp()
+
+
+class PipelineTests(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(PipelineTests, self).__init__(*args, **kwargs)
+        self.chunking_strategy = fastchunking.RabinKarpCDC(48, 0)
+
+    def test_iter_chunks(self):
+        content = os.urandom(1024 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        boundaries = list(chunker.next_chunk_boundaries(content))
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        chunks = list(fastchunking.pipeline.iter_chunks(io.BytesIO(content), chunker, block_size=10000))
+
+        self.assertEqual(b''.join(chunks), content)
+        chunk_ends = list(itertools.accumulate(map(len, chunks)))
+        self.assertEqual(chunk_ends[:len(boundaries)], boundaries)
+        self.assertEqual(chunk_ends[-1], len(content))
+
+    def test_read_ahead_reader(self):
+        content = os.urandom(100000)
+
+        # pipe, which is written concurrently in blocks not matching the buffer size
+        read_fd, write_fd = os.pipe()
+        with open(read_fd, 'rb') as pipe:
+            def write():
+                with open(write_fd, 'wb', buffering=0) as pipe_writer:
+                    for offset in range(0, len(content), 3000):
+                        pipe_writer.write(content[offset:offset + 3000])
+            writer = threading.Thread(target=write)
+            writer.start()
+            with fastchunking.pipeline.ReadAheadReader(pipe, buffer_size=4096, buffer_count=3) as reader:
+                self.assertEqual(b''.join(map(bytes, reader)), content)
+            writer.join()
+
+        # streams not supporting readinto, and a single buffer
+        stream = unittest.mock.Mock(spec=['read'], read=io.BytesIO(content).read)
+        with fastchunking.pipeline.ReadAheadReader(stream, buffer_size=4096, buffer_count=1) as reader:
+            self.assertEqual(b''.join(map(bytes, reader)), content)
+
+        # errors are raised by the consumer
+        stream = unittest.mock.Mock(spec=['readinto'], readinto=unittest.mock.Mock(side_effect=OSError))
+        with fastchunking.pipeline.ReadAheadReader(stream) as reader:
+            self.assertRaises(OSError, list, reader)
+
+        # no further blocks are read after closing, even if free buffers are available
+        read_started, read_allowed = threading.Event(), threading.Event()
+
+        def readinto(buf):
+            read_started.set()
+            read_allowed.wait()
+            return len(buf)
+        stream = unittest.mock.Mock(spec=['readinto'], readinto=unittest.mock.Mock(side_effect=readinto))
+        reader = fastchunking.pipeline.ReadAheadReader(stream, buffer_size=4096, buffer_count=3)
+        read_started.wait()
+        reader.close()
+        read_allowed.set()
+        reader._thread.join()
+        self.assertEqual(stream.readinto.call_count, 1)
+
+        # iteration stops after closing, instead of waiting for blocks that are never read
+        stream = unittest.mock.Mock(spec=['readinto'], readinto=unittest.mock.Mock(side_effect=len))
+        reader = fastchunking.pipeline.ReadAheadReader(stream, buffer_size=4096, buffer_count=3)
+        blocks = iter(reader)
+        self.assertEqual(len(next(blocks)), 4096)
+        reader.close()
+        self.assertEqual(list(blocks), [])
+        self.assertEqual(list(reader), [])
+
+    def test_iter_chunk_boundaries(self):
+        content = os.urandom(1024 * 1024)
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        boundaries = list(chunker.next_chunk_boundaries(content))
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        self.assertEqual(list(fastchunking.pipeline.iter_chunk_boundaries(io.BytesIO(content), chunker,
+                                                                          block_size=10000, buffer_count=4)),
+                         boundaries)
+
+    def test_compression_pipeline(self):
+        content = os.urandom(256 * 1024) * 4
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        chunks = list(fastchunking.pipeline.iter_chunks(io.BytesIO(content), chunker))
+
+        chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+        pipeline = fastchunking.pipeline.CompressionPipeline(chunker, workers=4, max_pending=3, block_size=10000)
+        compressed_chunks = list(pipeline.run(io.BytesIO(content)))
+
+        self.assertEqual(list(map(zlib.decompress, compressed_chunks)), chunks)
+        self.assertEqual(pipeline.chunking_stats.items, len(chunks))
+        self.assertEqual(pipeline.chunking_stats.bytes_in, len(content))
+        self.assertEqual(pipeline.compression_stats.items, len(chunks))
+        self.assertEqual(pipeline.compression_stats.bytes_out, sum(map(len, compressed_chunks)))
+
+
+class CodecTests(unittest.TestCase):
+
+    def test_socketpair(self):
+        content = os.urandom(1024 * 1024)
+        modified_content = content[:300000] + os.urandom(100) + content[300000:]
+
+        encoder = fastchunking.codec.StreamEncoder(fastchunking.RabinKarpCDC(48, 0), 4096)
+        decoder = fastchunking.codec.StreamDecoder()
+        encoded_lengths = []
+
+        sender_socket, receiver_socket = socket.socketpair()
+        with sender_socket, receiver_socket, receiver_socket.makefile('rb') as receiver:
+            def send():
+                for stream_content in (content, modified_content, b''):
+                    encoded_lengths.append(0)
+                    for data in encoder.encode(io.BytesIO(stream_content)):
+                        sender_socket.sendall(data)
+                        encoded_lengths[-1] += len(data)
+            sender = threading.Thread(target=send)
+            sender.start()
+            for stream_content in (content, modified_content, b''):
+                self.assertEqual(b''.join(decoder.decode(receiver)), stream_content)
+            sender.join()
+
+        self.assertGreater(encoded_lengths[0], len(content))
+        self.assertLess(encoded_lengths[1], 20 * 1024)
+
+    def test_cache_eviction(self):
+        chunks = [os.urandom(1000) for _ in range(50)]
+        content = b''.join(random.Random(0).choice(chunks) for _ in range(2000))
+
+        encoder = fastchunking.codec.StreamEncoder(fastchunking.SC(), 1000, max_cache_size=20000)
+        decoder = fastchunking.codec.StreamDecoder(max_cache_size=20000)
+        for _ in range(2):
+            encoded_content = b''.join(encoder.encode(io.BytesIO(content)))
+            self.assertLess(len(encoded_content), len(content))
+            self.assertEqual(b''.join(decoder.decode(io.BytesIO(encoded_content))), content)
+
+    def test_incomplete_stream(self):
+        chunks = [os.urandom(1000) for _ in range(200)]
+        encoder = fastchunking.codec.StreamEncoder(fastchunking.SC(), 1000)
+        decoder = fastchunking.codec.StreamDecoder()
+        self.assertEqual(b''.join(decoder.decode(io.BytesIO(b''.join(encoder.encode(io.BytesIO(chunks[0])))))),
+                         chunks[0])
+
+        # the records of an abandoned stream do not reach the decoder
+        encoded_pieces = encoder.encode(io.BytesIO(b''.join(chunks)))
+        next(encoded_pieces)
+        encoded_pieces.close()
+
+        content = b''.join(chunks[:2])
+        encoded_content = b''.join(encoder.encode(io.BytesIO(content)))
+        self.assertGreater(len(encoded_content), len(content))
+        self.assertEqual(b''.join(decoder.decode(io.BytesIO(encoded_content))), content)
+
+        # caches are used again for subsequent streams
+        encoded_content = b''.join(encoder.encode(io.BytesIO(content)))
+        self.assertLess(len(encoded_content), 100)
+        self.assertEqual(b''.join(decoder.decode(io.BytesIO(encoded_content))), content)
+
+    def test_invalid_streams(self):
+        encoder = fastchunking.codec.StreamEncoder(fastchunking.SC(), 1000, max_cache_size=20000)
+        encoded_content = b''.join(encoder.encode(io.BytesIO(os.urandom(10000))))
+
+        decoder = fastchunking.codec.StreamDecoder(max_cache_size=10000)
+        self.assertRaises(ValueError, list, decoder.decode(io.BytesIO(encoded_content)))
+        decoder = fastchunking.codec.StreamDecoder(max_cache_size=20000)
+        self.assertRaises(ValueError, list, decoder.decode(io.BytesIO(encoded_content[:-1])))
+        self.assertRaises(ValueError, list, decoder.decode(io.BytesIO(b'\0' * 100)))
+
+        # literal lengths are checked before reading
+        header = encoded_content[:len(fastchunking.codec._STREAM_MAGIC) + fastchunking.codec._STREAM_HEADER.size]
+        stream = unittest.mock.Mock(spec=['read'], read=unittest.mock.Mock(
+            side_effect=io.BytesIO(header + bytes([0]) + (2 ** 62).to_bytes(8, 'big')).read))
+        self.assertRaises(ValueError, list, decoder.decode(stream))
+        self.assertLessEqual(max(call[0][0] for call in stream.read.call_args_list), len(header))
+
+    def test_max_chunk_size(self):
+        content = os.urandom(100000)
+
+        # larger chunks are split by the encoder
+        encoder = fastchunking.codec.StreamEncoder(fastchunking.SC(), 50000, max_chunk_size=30000)
+        decoder = fastchunking.codec.StreamDecoder(max_chunk_size=30000)
+        for _ in range(2):
+            encoded_content = b''.join(encoder.encode(io.BytesIO(content)))
+            self.assertEqual(b''.join(decoder.decode(io.BytesIO(encoded_content))), content)
+        self.assertLess(len(encoded_content), 1000)
+
+        encoder = fastchunking.codec.StreamEncoder(fastchunking.SC(), 50000)
+        encoded_content = b''.join(encoder.encode(io.BytesIO(content)))
+        self.assertRaises(ValueError, list, decoder.decode(io.BytesIO(encoded_content)))
+
+
+class DedupEstimatorTests(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(0)
+        chunks = [generator.getrandbits(8 * 1000).to_bytes(1000, 'little') for _ in range(2000)]
+        self.chunk_sequence = [generator.choice(chunks[:generator.choice((100, 2000))]) for _ in range(20000)]
+        self.content = b''.join(self.chunk_sequence)
+        self.ratio = len(self.content) / (1000 * len(set(self.chunk_sequence)))
+
+    def test_estimate(self):
+        estimator = fastchunking.estimate.DedupEstimator(fastchunking.SC(), 1000, sample_rate=1)
+        estimator.add_stream(io.BytesIO(self.content))
+        self.assertAlmostEqual(estimator.ratio, self.ratio)
+        self.assertAlmostEqual(estimator.unique_bytes, 1000 * len(set(self.chunk_sequence)))
+        self.assertEqual(estimator.sampled_chunks, len(set(self.chunk_sequence)))
+
+        estimator = fastchunking.estimate.DedupEstimator(fastchunking.SC(), 1000, sample_rate=0.1)
+        estimator.add_stream(io.BytesIO(self.content))
+        self.assertEqual(estimator.bytes, len(self.content))
+        self.assertLess(estimator.sampled_chunks, len(set(self.chunk_sequence)) / 5)
+        lower, upper = estimator.confidence_interval()
+        self.assertLessEqual(lower, self.ratio)
+        self.assertLessEqual(self.ratio, upper)
+
+    def test_add_files(self):
+        paths = []
+        for offset in range(0, len(self.content), 1000000):
+            with tempfile.NamedTemporaryFile(delete=False) as file_:
+                self.addCleanup(os.remove, file_.name)
+                file_.write(self.content[offset:offset + 1000000])
+            paths.append(file_.name)
+
+        estimator = fastchunking.estimate.DedupEstimator(fastchunking.RabinKarpCDC(48, 0), 1024)
+        estimator.add_files(paths)
+        self.assertEqual((estimator.files, estimator.bytes), (len(paths), len(self.content)))
+
+        estimator = fastchunking.estimate.DedupEstimator(fastchunking.RabinKarpCDC(48, 0), 1024)
+        estimator.add_files(paths, file_fraction=0.5, seed=0)
+        self.assertLess(estimator.files, len(paths))
+        self.assertEqual(estimator.bytes, estimator.files * 1000000)
+
+
+class ProcessChunkerPoolTests(unittest.TestCase):
+
+    def test_map(self):
+        messages = [os.urandom(length) for length in (0, 1000, 100 * 1024, 300 * 1024, 100 * 1024, 1000)]
+
+        for chunking_strategy in (fastchunking.SC(), fastchunking.RabinKarpCDC(48, 0)):
+            with fastchunking.parallel.ProcessChunkerPool(chunking_strategy, 4096, processes=2) as pool:
+                boundaries = list(pool.map(messages, max_pending=3))
+
+            expected_boundaries = [list(chunking_strategy.create_chunker(4096).next_chunk_boundaries(message))
+                                   for message in messages]
+            self.assertEqual([list(message_boundaries) for message_boundaries in boundaries], expected_boundaries)
+
+    def test_segment_reuse(self):
+        message = os.urandom(100 * 1024)
+
+        with fastchunking.parallel.ProcessChunkerPool(fastchunking.RabinKarpCDC(48, 0), 4096, processes=2) as pool:
+            for _ in pool.map([message] * 20, max_pending=2):
+                pass
+            self.assertLessEqual(len(pool._segments), 4)
+
+    def test_concurrent_map(self):
+        messages = [os.urandom(length) for length in (1000, 100 * 1024, 300 * 1024)] * 10
+        expected_boundaries = [list(fastchunking.SC().create_chunker(4096).next_chunk_boundaries(message))
+                               for message in messages]
+
+        results = [None] * 4
+        with fastchunking.parallel.ProcessChunkerPool(fastchunking.SC(), 4096, processes=2) as pool:
+            def run(index):
+                results[index] = [list(boundaries) for boundaries in pool.map(messages, max_pending=3)]
+            threads = [threading.Thread(target=run, args=(index,)) for index in range(len(results))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # all segments are known to the pool, so that they are freed when it is closed
+            self.assertEqual(len(pool._segments), sum(map(len, pool._free_segments.values())))
+        self.assertEqual(results, [expected_boundaries] * len(results))
+
+
+class ChunkStoreTests(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(ChunkStoreTests, self).__init__(*args, **kwargs)
+        self.chunking_strategy = fastchunking.RabinKarpCDC(48, 0)
+
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.path = temporary_directory.name
+
+    def test_put_stream(self):
+        content = os.urandom(512 * 1024)
+
+        with fastchunking.store.ChunkStore(self.path, write_buffer_size=10000) as store:
+            chunker = self.chunking_strategy.create_chunker(chunk_size=4096)
+            fingerprints = store.put_stream(io.BytesIO(content + content), chunker)
+
+            self.assertEqual(b''.join(map(store.get, fingerprints)), content + content)
+            self.assertEqual(len(store), len(set(fingerprints)))
+
+        # duplicate chunks are stored only once
+        pack_size = os.path.getsize(os.path.join(self.path, 'pack-00000000.dat'))
+        self.assertLess(pack_size, len(content) + 64 * 1024)
+
+    def test_persistence(self):
+        chunks = [os.urandom(1000) for _ in range(1000)]
+
+        with fastchunking.store.ChunkStore(self.path, max_pack_size=100000, max_pending_entries=300) as store:
+            fingerprints = list(map(store.put, chunks[:500]))
+
+        with fastchunking.store.ChunkStore(self.path, max_pack_size=100000) as store:
+            fingerprints.extend(map(store.put, chunks[400:]))
+            self.assertEqual(len(store), 1000)
+
+        with fastchunking.store.ChunkStore(self.path) as store:
+            self.assertEqual(list(map(store.get, fingerprints)), chunks[:500] + chunks[400:])
+            self.assertNotIn(bytes(32), store)
+            with self.assertRaises(KeyError):
+                store.get(bytes(32))
+
+        self.assertGreater(len([name for name in os.listdir(self.path) if name.startswith('pack-')]), 1)
+
+    def test_index_runs(self):
+        chunks = [os.urandom(100) for _ in range(1000)]
+
+        with fastchunking.store.ChunkStore(self.path, max_pending_entries=10) as store:
+            fingerprints = list(map(store.put, chunks))
+
+            # flushes do not rewrite the whole index, but the number of runs is logarithmic
+            index_names = [name for name in os.listdir(self.path) if name.startswith('index-')]
+            self.assertGreater(len(index_names), 1)
+            self.assertLessEqual(len(index_names), 8)
+
+        # leftovers of an interrupted merge, i.e., runs whose flushes are contained in a merged run, are removed
+        self.assertNotIn('index-00000000-00000000', index_names)
+        with open(os.path.join(self.path, 'index-00000000-00000000'), 'wb') as index_file:
+            index_file.write(b'FCIDX\0\0\1' + bytes(48))
+        with fastchunking.store.ChunkStore(self.path) as store:
+            self.assertEqual(len(store), 1000)
+            self.assertEqual(list(map(store.get, fingerprints)), chunks)
+        self.assertNotIn('index-00000000-00000000', os.listdir(self.path))
+
+    def test_close(self):
+        store = fastchunking.store.ChunkStore(self.path)
+        store.put(b'chunk')
+        store.close()
+        store.close()
+
+        with fastchunking.store.ChunkStore(self.path) as store:
+            self.assertEqual(len(store), 1)
+
+
+class BoundaryCacheTests(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(BoundaryCacheTests, self).__init__(*args, **kwargs)
+        self.chunking_strategy = fastchunking.RabinKarpCDC(48, 0)
+
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.database_path = os.path.join(temporary_directory.name, 'cache.db')
+        self.file_path = os.path.join(temporary_directory.name, 'file')
+        self.content = os.urandom(256 * 1024)
+        with open(self.file_path, 'wb') as file_:
+            file_.write(self.content)
+
+    def test_next_chunk_boundaries_file(self):
+        expected = list(self.chunking_strategy.create_chunker(4096).next_chunk_boundaries(self.content))
+
+        with fastchunking.cache.BoundaryCache(self.database_path) as cache:
+            self.assertEqual(cache.next_chunk_boundaries_file(self.file_path, self.chunking_strategy, 4096), expected)
+
+        # cached results are returned without reading the file
+        with fastchunking.cache.BoundaryCache(self.database_path) as cache:
+            with unittest.mock.patch('fastchunking.open', side_effect=AssertionError, create=True):
+                self.assertEqual(cache.next_chunk_boundaries_file(self.file_path, self.chunking_strategy, 4096),
+                                 expected)
+            self.assertEqual(len(cache), 1)
+
+    def test_next_chunk_boundaries_levels_file(self):
+        chunk_sizes = [1024, 2048, 4096]
+        expected = list(self.chunking_strategy.create_multilevel_chunker(chunk_sizes).next_chunk_boundaries_levels(
+            self.content))
+
+        with fastchunking.cache.BoundaryCache(self.database_path) as cache:
+            for _ in range(2):
+                self.assertEqual(cache.next_chunk_boundaries_levels_file(self.file_path, self.chunking_strategy,
+                                                                         chunk_sizes), expected)
+            self.assertEqual(len(cache), 1)
+
+        # sparse files
+        file_name, content = create_sparse_file(self, [self.content[:10000], self.content[10000:]], 3 * 1024 * 1024)
+        expected = list(self.chunking_strategy.create_multilevel_chunker(chunk_sizes).next_chunk_boundaries_levels(
+            content))
+        with fastchunking.cache.BoundaryCache(self.database_path) as cache:
+            self.assertEqual(cache.next_chunk_boundaries_levels_file(file_name, self.chunking_strategy, chunk_sizes),
+                             expected)
+
+    def test_empty_file(self):
+        open(self.file_path, 'wb').close()
+
+        with fastchunking.cache.BoundaryCache(self.database_path) as cache:
+            for _ in range(2):
+                self.assertEqual(cache.next_chunk_boundaries_file(self.file_path, self.chunking_strategy, 4096), [])
+            cache.put(self.file_path, self.chunking_strategy, [4096], [], digests=[])
+            entry = cache.get(self.file_path, self.chunking_strategy, [4096])
+            self.assertEqual(entry.boundaries.tolist(), [])
+            self.assertEqual(entry.digests, [])
+
+    def test_invalidation(self):
+        with fastchunking.cache.BoundaryCache(self.database_path) as cache:
+            cache.put(self.file_path, self.chunking_strategy, [4096], [1, 2, 3], digests=[b'a' * 32, b'b' * 32])
+            entry = cache.get(self.file_path, self.chunking_strategy, [4096])
+            self.assertEqual(entry.boundaries.tolist(), [1, 2, 3])
+            self.assertEqual(entry.digests, [b'a' * 32, b'b' * 32])
+
+            # different parameters
+            self.assertIsNone(cache.get(self.file_path, self.chunking_strategy, [8192]))
+            self.assertIsNone(cache.get(self.file_path, fastchunking.RabinKarpCDC(48, 1), [4096]))
+            self.assertIsNone(cache.get(self.file_path, fastchunking.RabinKarpCDC(32, 0), [4096]))
+            self.assertIsNone(cache.get(self.file_path, fastchunking.RabinKarpCDC(48, 0, delimiter=b'\n'), [4096]))
+            self.assertIsNone(cache.get(self.file_path, self.chunking_strategy, [4096], multilevel=True))
+            self.assertIsNone(cache.get(self.file_path, fastchunking.SC(), [4096]))
+
+            # modified file
+            stat_result = os.stat(self.file_path)
+            os.utime(self.file_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1000))
+            self.assertIsNone(cache.get(self.file_path, self.chunking_strategy, [4096]))
+            self.assertEqual(cache.next_chunk_boundaries_file(self.file_path, self.chunking_strategy, 4096),
+                             list(self.chunking_strategy.create_chunker(4096).next_chunk_boundaries(self.content)))
+            self.assertEqual(len(cache), 1)
+
+    def test_eviction(self):
+        paths = [self.file_path]
+        for i in range(3):
+            paths.append(self.file_path + str(i))
+            with open(paths[-1], 'wb') as file_:
+                file_.write(self.content)
+
+        # each entry takes 8 bytes per boundary
+        with fastchunking.cache.BoundaryCache(self.database_path, max_size=24) as cache:
+            cache.put(paths[0], self.chunking_strategy, [4096], [1])
+            cache.put(paths[1], self.chunking_strategy, [4096], [1])
+            cache.put(paths[2], self.chunking_strategy, [4096], [1])
+            self.assertIsNotNone(cache.get(paths[0], self.chunking_strategy, [4096]))
+            cache.put(paths[3], self.chunking_strategy, [4096], [1])
+            cache.put(paths[3], self.chunking_strategy, [8192], [1, 2, 3, 4])
+
+        with fastchunking.cache.BoundaryCache(self.database_path, max_size=24) as cache:
+            self.assertIsNotNone(cache.get(paths[0], self.chunking_strategy, [4096]))
+            self.assertIsNone(cache.get(paths[1], self.chunking_strategy, [4096]))
+            self.assertIsNotNone(cache.get(paths[2], self.chunking_strategy, [4096]))
+            self.assertIsNotNone(cache.get(paths[3], self.chunking_strategy, [4096]))
+            self.assertIsNone(cache.get(paths[3], self.chunking_strategy, [8192]))
+            cache.put(paths[1], self.chunking_strategy, [4096], [1])
+            self.assertIsNone(cache.get(paths[0], self.chunking_strategy, [4096]))
+            self.assertEqual(len(cache), 3)
+
 
 class AbstractTests(unittest.TestCase):
 
@@ -181,6 +1034,28 @@ class AbstractTests(unittest.TestCase):
         with self.assertRaises(TypeError):
             Test()
 
+        # chunkers only implementing next_chunk_boundaries support lazy chunking
+        class EagerTest(fastchunking.BaseChunker):
+            __slots__ = ('length',)
+
+            def __init__(self):
+                self.length = 0
+
+            def next_chunk_boundaries(self, buf, prepend_bytes=0):
+                boundaries = []
+                for position in range(len(buf)):
+                    self.length += 1
+                    if self.length % 3 == 0:
+                        boundaries.append(position + 1)
+                return boundaries
+
+        chunker = EagerTest()
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10), 3)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10, 3), 6)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10, 6, 8), None)
+        self.assertEqual(chunker.find_next_boundary(b'0' * 10, 8), 9)
+        self.assertEqual(chunker.length, 9)
+
 
 if __name__ == "__main__":
     unittest.main()
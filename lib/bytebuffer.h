@@ -0,0 +1,19 @@
+/*
+ * A read-only view of contiguous bytes, as passed from Python to the chunking engines.
+ *
+ * License: Apache 2.0
+ *
+ */
+#ifndef BYTEBUFFER_H
+#define BYTEBUFFER_H
+
+// offsets and lengths are 64-bit throughout, so that buffers of 4 GiB or more (e.g., mapped disk images) are supported
+typedef unsigned long long uint64;
+
+struct ByteBuffer {
+	/* A read-only view of contiguous bytes, e.g., of a Python object supporting the buffer protocol. */
+	const char* data;
+	uint64 length;
+};
+
+#endif
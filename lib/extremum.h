@@ -0,0 +1,185 @@
+/*
+ * Content-defined chunking based on local extrema, i.e., without computing any hash values.
+ *
+ * - AsymmetricExtremum implements the asymmetric extremum (AE) algorithm by Zhang et al. (INFOCOM 2015).
+ * - RapidAsymmetricMaximum implements the rapid asymmetric maximum (RAM) algorithm by Widodo et al. (2017).
+ *
+ * License: Apache 2.0
+ *
+ */
+#ifndef EXTREMUM_H
+#define EXTREMUM_H
+
+#include <cstring>
+#include <list>
+#include "bytebuffer.h"
+
+class AsymmetricExtremum {
+	/* A chunk boundary is created window_size bytes after the first position of a chunk whose value is strictly
+	 * greater than the values of all preceding positions of the chunk and not less than the values of the window_size
+	 * following positions.
+	 *
+	 * The value of a position is the (big-endian) 64-bit integer consisting of the 8 bytes ending at this position,
+	 * which makes equal values (and thus ties) unlikely. The expected chunk size is about 1.78 * window_size.
+	 */
+public:
+	AsymmetricExtremum(int my_window_size) :
+			window_size(my_window_size),
+			value(0),
+			position(0),
+			max_value(0),
+			max_position(0) {
+	}
+
+	std::list<uint64> next_chunk_boundaries(const ByteBuffer *str, const uint64 prepend_bytes) {
+		/* On input a Python string, this function computes a Python list object containing chunk boundary positions.
+		 * Prepended zero bytes are processed like content, but chunk boundaries within them are not reported. */
+		const char* cstr = str->data;
+		const uint64 len = str->length;
+
+		prepend_zeros(prepend_bytes);
+
+		std::list<uint64> results;
+		for (uint64 i = 0; i < len; ++i)
+			if (update(cstr[i]))
+				results.push_back(i + 1);
+		return (results);
+	}
+
+	long long next_chunk_boundary(const ByteBuffer *str) {
+		/* Consumes str up to (and including) its first chunk boundary and returns the boundary position, or -1 if str
+		 * does not contain any chunk boundary, in which case str is consumed entirely. */
+		const char* cstr = str->data;
+		const uint64 len = str->length;
+
+		for (uint64 i = 0; i < len; ++i)
+			if (update(cstr[i]))
+				return (i + 1);
+		return (-1);
+	}
+
+private:
+	void prepend_zeros(uint64 count) {
+		/* Consumes count zero bytes in time independent of count: Once a chunk starts with value 0, every chunk of
+		 * zero bytes consists of window_size + 1 bytes, after which the state is the same again. This state is
+		 * reached after at most window_size + 9 zero bytes. */
+		while (count > 0) {
+			if (position == 0 && value == 0) {
+				count %= window_size + 1;
+				if (count == 0)
+					break;
+			}
+			update(0);
+			--count;
+		}
+	}
+
+	bool update(unsigned char b) {
+		/* Consumes a byte and returns whether it ends the current chunk. */
+		value = (value << 8) | b;
+		if (position == 0 || value > max_value) {
+			max_value = value;
+			max_position = position;
+		} else if (position == max_position + window_size) {
+			position = 0;
+			return (true);
+		}
+		++position;
+		return (false);
+	}
+
+	const uint64 window_size;
+	uint64 value;
+	uint64 position; // position of the next byte within the current chunk
+	uint64 max_value;
+	uint64 max_position;
+};
+
+class RapidAsymmetricMaximum {
+	/* The maximum byte value within the first window_size bytes of a chunk is determined, and the chunk ends at the
+	 * first subsequent byte whose value is at least this maximum value. */
+public:
+	RapidAsymmetricMaximum(int my_window_size) :
+			window_size(my_window_size),
+			position(0),
+			max_value(0) {
+	}
+
+	std::list<uint64> next_chunk_boundaries(const ByteBuffer *str, const uint64 prepend_bytes) {
+		/* On input a Python string, this function computes a Python list object containing chunk boundary positions.
+		 * Prepended zero bytes are processed like content, but chunk boundaries within them are not reported. */
+		const unsigned char* cstr = (const unsigned char*) str->data;
+		const uint64 len = str->length;
+
+		prepend_zeros(prepend_bytes);
+
+		std::list<uint64> results;
+		for (uint64 i = 0; i < len;) {
+			i = _next_chunk_boundary(cstr, i, len);
+			if (position == 0)
+				results.push_back(i);
+		}
+		return (results);
+	}
+
+	long long next_chunk_boundary(const ByteBuffer *str) {
+		/* Consumes str up to (and including) its first chunk boundary and returns the boundary position, or -1 if str
+		 * does not contain any chunk boundary, in which case str is consumed entirely. */
+		const unsigned char* cstr = (const unsigned char*) str->data;
+		const uint64 len = str->length;
+
+		if (len == 0)
+			return (-1);
+		const uint64 i = _next_chunk_boundary(cstr, 0, len);
+		return (position == 0 ? (long long) i : -1);
+	}
+
+private:
+	void prepend_zeros(uint64 count) {
+		/* Consumes count zero bytes in time independent of count: A chunk starting with zero bytes consists of
+		 * window_size + 1 zero bytes, after which the state is the same again, whereas zero bytes never end a chunk
+		 * whose maximum value is not 0 once its window is complete. */
+		const unsigned char zero = 0;
+		while (count > 0) {
+			if (position == 0)
+				count %= window_size + 1;
+			else if (position == window_size && max_value != 0)
+				break;
+			if (count == 0)
+				break;
+			_next_chunk_boundary(&zero, 0, 1);
+			--count;
+		}
+	}
+
+	uint64 _next_chunk_boundary(const unsigned char* str, uint64 pos, const uint64 len) {
+		/* Consumes bytes starting at pos up to the end of the current chunk (if it ends before len) and returns the
+		 * position following the consumed bytes. */
+		for (; position < window_size && pos < len; ++position, ++pos)
+			if (position == 0 || str[pos] > max_value)
+				max_value = str[pos];
+		if (position < window_size)
+			return (len);
+
+		if (max_value == 0xFF) {
+			// most chunks (except for very small chunk sizes), which are found using a fast scan
+			const void* match = std::memchr(str + pos, 0xFF, len - pos);
+			if (match == NULL)
+				return (len);
+			pos = (const unsigned char*) match - str;
+		} else {
+			while (pos < len && str[pos] < max_value)
+				++pos;
+			if (pos == len)
+				return (len);
+		}
+		position = 0;
+		return (pos + 1);
+	}
+
+	const uint64 window_size;
+	uint64 position; // position of the next byte within the current chunk, saturating at window_size
+	unsigned char max_value;
+};
+
+#endif
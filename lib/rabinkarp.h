@@ -16,11 +16,13 @@
 #define RABINKARP_H
 
 #include <algorithm>
+#include "bytebuffer.h"
 #include "characterhash.h"
 
 #include <cstring>
 #include <iostream>
 #include <list>
+#include <vector>
 
 class RabinKarp {
 	/* Implementation of the Rabin-Karp hash function.
@@ -49,12 +51,9 @@ protected:
 		 */
 
 		if (window_level != window_size)
-			// corresponds to eat() in the original implementation
-			hashvalue = (B * hashvalue + hasher.hashvalues[b]) & HASHMASK;
+			hashvalue = _eat(hashvalue, b);
 		else
-			// corresponds to update() in the original implementation
-			hashvalue = (B * hashvalue + hasher.hashvalues[b]
-					        - BtoN * hasher.hashvalues[window[window_head]]) & HASHMASK;
+			hashvalue = _roll(hashvalue, b, window[window_head]);
 
 		// store consumed byte in rolling hash window
 		window[window_head] = b;
@@ -68,6 +67,31 @@ protected:
 			window_level += 1;
 	}
 
+	uint32 _eat(uint32 hashvalue, unsigned char in) {
+		/* Returns the hash value after appending a byte to a window that is not completely filled (corresponds to eat()
+		 * in the original implementation). */
+		return ((B * hashvalue + hasher.hashvalues[in]) & HASHMASK);
+	}
+
+	uint32 _roll(uint32 hashvalue, unsigned char in, unsigned char out) {
+		/* Returns the hash value after appending a byte to a completely filled window and removing its oldest byte
+		 * (corresponds to update() in the original implementation). */
+		return ((B * hashvalue + hasher.hashvalues[in] - BtoN * hasher.hashvalues[out]) & HASHMASK);
+	}
+
+	static uint64 _find_run_end(const char* str, uint64 pos, const uint64 len, unsigned char b) {
+		/* Returns the position of the first byte at or after pos that differs from b, or len if there is none. */
+		const uint64 pattern = 0x0101010101010101ULL * b;
+		for (uint64 word; pos + sizeof(word) <= len; pos += sizeof(word)) {
+			std::memcpy(&word, str + pos, sizeof(word));
+			if (word != pattern)
+				break;
+		}
+		while (pos < len && (unsigned char) str[pos] == b)
+			++pos;
+		return (pos);
+	}
+
 	uint32 _compute_threshold(double my_threshold) {
 		/* resolves a relative threshold (e.g., 0.01 for 1% matching hash values) to an absolute threshold in the range
 		 * of actual hash values. */
@@ -95,44 +119,310 @@ public:
 			hashvalue(0),
 			window_level(0),
 			window_head(0),
+			run_byte(0),
+			run_length(0),
+			seed(seed),
+			super_feature_count(0),
+			features_per_super_feature(0),
+			feature_count(0),
+			feature_multipliers(NULL),
+			feature_increments(NULL),
+			features(NULL),
+			delimiter(-1),
+			max_chunk_size(0),
+			chunk_length(0),
+			delimiter_pending(false),
 			RabinKarp(my_window_size, seed) {
 		window = (unsigned char*) malloc(window_size * sizeof(unsigned char));
 	}
 
 	~RabinKarpHash() {
 		free(window);
+		delete[] feature_multipliers;
+		delete[] feature_increments;
+		delete[] features;
+	}
+
+	void set_features(int my_super_feature_count, int my_features_per_super_feature) {
+		/* Enables computation of super-features by next_chunk_boundaries_with_features.
+		 *
+		 * Each feature is the minimum of a (pseudo-randomly chosen) linear transformation of the sampled hash values
+		 * within a chunk, and each super-feature combines features_per_super_feature such features. */
+		super_feature_count = my_super_feature_count;
+		features_per_super_feature = my_features_per_super_feature;
+		feature_count = super_feature_count * features_per_super_feature;
+
+		delete[] feature_multipliers;
+		delete[] feature_increments;
+		delete[] features;
+		feature_multipliers = new uint32[feature_count];
+		feature_increments = new uint32[feature_count];
+		features = new uint32[feature_count];
+
+		mersenneRNG randomgenerator(0xFFFFFFFFU);
+		randomgenerator.seed(seed ^ 0x5BD1E995U);
+		for (int k = 0; k < feature_count; ++k) {
+			feature_multipliers[k] = randomgenerator() | 1; // odd multipliers yield permutations of hash values
+			feature_increments[k] = randomgenerator();
+		}
+		_reset_features();
 	}
 
 	void set_threshold(double my_threshold) {
 		threshold = _compute_threshold(my_threshold);
 	}
 
-	std::list<unsigned int> next_chunk_boundaries(const std::string *str, const unsigned int prepend_bytes) {
+	void set_delimiter(int my_delimiter, uint64 my_max_chunk_size) {
+		/* Enables delimiter-aligned chunking: If the hash value matches the threshold, the chunk ends after the next
+		 * occurrence of the delimiter byte (including the current position), or after max_chunk_size bytes, whichever
+		 * comes first. Prepended zero bytes only affect the hash values, not chunk lengths. */
+		delimiter = my_delimiter;
+		max_chunk_size = my_max_chunk_size;
+		chunk_length = 0;
+		delimiter_pending = false;
+	}
+
+	std::list<uint64> next_chunk_boundaries(const ByteBuffer *str, const uint64 prepend_bytes) {
 		/* On input a Python string, this function computes a Python list object containing chunk boundary positions. */
-		const char* cstr = str->c_str();
-		const unsigned int len = str->length();
+		const char* cstr = str->data;
+		const uint64 len = str->length;
 
-		for (unsigned int i = 0; i < prepend_bytes; ++i)
+		// after window_size zero bytes, further zero bytes do not change the state anymore
+		for (uint64 i = 0; i < std::min(prepend_bytes, (uint64) window_size); ++i)
 			update(0);
 
-		std::list<unsigned int> results;
-		for (unsigned int i = 0; i < len; ++i) {
+		std::list<uint64> results;
+		if (delimiter != -1) {
+			for (uint64 i = 0; i < len;) {
+				i = _next_delimited_chunk_boundary(cstr, i, len);
+				if (chunk_length == 0)
+					results.push_back(i);
+			}
+			return (results);
+		}
+
+		for (uint64 i = 0; i < len; ++i) {
 			update(cstr[i]);
 			if (window_level == window_size && hashvalue < threshold)
 				results.push_back(i + 1);
+
+			if (run_length == window_size) {
+				/* the window consists of identical bytes only, so the hash value remains unchanged until the run of
+				 * identical bytes ends, i.e., we can skip the run (or, if the hash value matches, every position
+				 * within the run is a chunk boundary) */
+				const uint64 run_end = _find_run_end(cstr, i + 1, len, run_byte);
+				if (hashvalue < threshold)
+					for (uint64 j = i + 1; j < run_end; ++j)
+						results.push_back(j + 1);
+				i = run_end - 1;
+			}
 		}
 		return (results);
 	}
 
+	std::list<uint64> next_chunk_boundaries_zeros(const uint64 count) {
+		/* Same as next_chunk_boundaries, but for content consisting of count zero bytes (e.g., a hole within a sparse
+		 * file), which does not need to be materialized. */
+		std::list<uint64> results;
+		for (uint64 i = 0; i < count; ++i) {
+			update(0);
+			if (window_level == window_size && hashvalue < threshold)
+				results.push_back(i + 1);
+
+			if (run_length == window_size) {
+				// the state does not change anymore (see next_chunk_boundaries)
+				if (hashvalue < threshold)
+					for (uint64 j = i + 1; j < count; ++j)
+						results.push_back(j + 1);
+				break;
+			}
+		}
+		return (results);
+	}
+
+	std::list<uint64> next_chunk_boundaries_with_features(const ByteBuffer *str, const uint64 prepend_bytes) {
+		/* Same as next_chunk_boundaries, but each chunk boundary is followed by the super-features of the chunk ending
+		 * at this boundary (see set_features). Only positions within str contribute to super-features. */
+		const char* cstr = str->data;
+		const uint64 len = str->length;
+
+		for (uint64 i = 0; i < std::min(prepend_bytes, (uint64) window_size); ++i)
+			update(0);
+
+		std::list<uint64> results;
+		for (uint64 i = 0; i < len; ++i) {
+			update(cstr[i]);
+			if (window_level != window_size)
+				continue;
+
+			/* features are computed from a content-defined sample of hash values only, which always includes the hash
+			 * value at the chunk boundary */
+			const bool is_boundary = hashvalue < threshold;
+			if (is_boundary || (hashvalue & FEATURE_SAMPLING_MASK) == 0)
+				_update_features();
+			if (is_boundary)
+				_push_boundary_with_features(results, i + 1);
+
+			if (run_length == window_size) {
+				// skip the run of identical bytes (see next_chunk_boundaries), which leaves features unchanged
+				const uint64 run_end = _find_run_end(cstr, i + 1, len, run_byte);
+				if (hashvalue < threshold)
+					for (uint64 j = i + 1; j < run_end; ++j) {
+						_update_features();
+						_push_boundary_with_features(results, j + 1);
+					}
+				i = run_end - 1;
+			}
+		}
+		return (results);
+	}
+
+	long long next_chunk_boundary(const ByteBuffer *str) {
+		/* Consumes str up to (and including) its first chunk boundary and returns the boundary position, or -1 if str
+		 * does not contain any chunk boundary, in which case str is consumed entirely. */
+		const char* cstr = str->data;
+		const uint64 len = str->length;
+
+		if (delimiter != -1) {
+			for (uint64 i = 0; i < len;) {
+				i = _next_delimited_chunk_boundary(cstr, i, len);
+				if (chunk_length == 0)
+					return (i);
+			}
+			return (-1);
+		}
+
+		for (uint64 i = 0; i < len; ++i) {
+			update(cstr[i]);
+			if (window_level == window_size && hashvalue < threshold)
+				return (i + 1);
+
+			if (run_length == window_size) {
+				// skip the run of identical bytes (see next_chunk_boundaries); the hash value does not match here
+				const uint64 run_end = _find_run_end(cstr, i + 1, len, run_byte);
+				i = run_end - 1;
+			}
+		}
+		return (-1);
+	}
+
 private:
 	void update(unsigned char b) {
 		_update(b, hashvalue, window, window_head, window_level);
+
+		// keep track of the number of identical bytes at the end of the window
+		if (b != run_byte) {
+			run_byte = b;
+			run_length = 1;
+		} else if (run_length != window_size) {
+			run_length += 1;
+		}
+	}
+
+	uint64 _next_delimited_chunk_boundary(const char* str, uint64 pos, const uint64 len) {
+		/* Consumes bytes starting at pos up to the end of the current chunk (if it ends before len) in delimiter-aligned
+		 * mode and returns the position following the consumed bytes. chunk_length is 0 if the chunk ends there. */
+		while (pos < len) {
+			// the number of bytes that can be consumed before the chunk reaches max_chunk_size
+			const uint64 limit = pos + std::min(len - pos, max_chunk_size - chunk_length);
+
+			if (delimiter_pending) {
+				/* the hash values do not matter until the chunk ends, so the content is scanned for the delimiter
+				 * directly, and only the last window_size bytes are passed to the rolling hash */
+				const void* match = std::memchr(str + pos, delimiter, limit - pos);
+				const uint64 end = match != NULL ? (const char*) match - str + 1 : limit;
+				_consume(str, pos, end);
+				chunk_length += end - pos;
+				pos = end;
+				if (match != NULL || chunk_length == max_chunk_size)
+					return (_end_chunk(pos));
+				continue;
+			}
+
+			const unsigned char b = str[pos++];
+			update(b);
+			++chunk_length;
+			if (window_level == window_size && hashvalue < threshold) {
+				if (b == delimiter)
+					return (_end_chunk(pos));
+				delimiter_pending = true;
+			} else if (run_length == window_size && pos < limit) {
+				// skip the run of identical bytes (see next_chunk_boundaries); the hash value does not match here
+				const uint64 run_end = _find_run_end(str, pos, limit, run_byte);
+				chunk_length += run_end - pos;
+				pos = run_end;
+			}
+			if (chunk_length == max_chunk_size)
+				return (_end_chunk(pos));
+		}
+		return (len);
+	}
+
+	uint64 _end_chunk(uint64 pos) {
+		chunk_length = 0;
+		delimiter_pending = false;
+		return (pos);
+	}
+
+	void _consume(const char* str, uint64 begin, uint64 end) {
+		/* Consumes str[begin:end] without evaluating intermediate hash values. As the state only depends on the last
+		 * window_size bytes, only these are consumed (starting with an empty window). */
+		if (end - begin >= (uint64) window_size) {
+			hashvalue = 0;
+			window_level = 0;
+			window_head = 0;
+			run_length = 0;
+			begin = end - window_size;
+		}
+		for (; begin < end; ++begin)
+			update(str[begin]);
 	}
 
 	int window_level;
 	int window_head;
 	unsigned char* window;
 
+	unsigned char run_byte;
+	int run_length;
+
+	// delimiter byte (or -1 if chunks are not aligned to a delimiter), see set_delimiter
+	int delimiter;
+	uint64 max_chunk_size;
+	uint64 chunk_length; // number of bytes of the current chunk consumed so far
+	bool delimiter_pending; // whether the hash value has matched within the current chunk
+
+	void _update_features() {
+		for (int k = 0; k < feature_count; ++k)
+			features[k] = std::min(features[k], hashvalue * feature_multipliers[k] + feature_increments[k]);
+	}
+
+	void _reset_features() {
+		for (int k = 0; k < feature_count; ++k)
+			features[k] = 0xFFFFFFFFU;
+	}
+
+	void _push_boundary_with_features(std::list<uint64> &results, uint64 boundary) {
+		results.push_back(boundary);
+		for (int k = 0; k < feature_count; k += features_per_super_feature) {
+			// combine features using FNV-1a
+			uint32 super_feature = 2166136261U;
+			for (int l = k; l < k + features_per_super_feature; ++l)
+				super_feature = (super_feature ^ features[l]) * 16777619U;
+			results.push_back(super_feature);
+		}
+		_reset_features();
+	}
+
+	static const uint32 FEATURE_SAMPLING_MASK = 15; // sample one out of 16 hash values on average
+
+	const int seed;
+	int super_feature_count;
+	int features_per_super_feature;
+	int feature_count;
+	uint32* feature_multipliers;
+	uint32* feature_increments;
+	uint32* features;
+
 	uint32 threshold;
 	uint32 hashvalue;
 };
@@ -151,6 +441,15 @@ class RabinKarpMultiThresholdHash: RabinKarp {
 	 *   corresponding level-i chunk. For this reason, a single chunking instance is not enough. Instead, we use one
 	 *   chunking instance for each individual threshold, filling lower-level windows with zeros whenever a chunk
 	 *   boundary at a higher level has been found.
+	 *
+	 * As all chunkers consume the same content, their windows are not stored individually: The window of the most
+	 * restrictive chunker (which is never reset) is stored in a history buffer. A chunker that has been reset at least
+	 * window_size bytes ago has the same window and hash value. The window of any other chunker consists of a prefix
+	 * (its window at the time of its last reset, including the appended zeros) followed by the bytes consumed since
+	 * then, which are contained in the history buffer. Neighboring chunkers reset together share such a prefix and a
+	 * hash value, forming a group. As long as only the most restrictive chunker is in use (see
+	 * least_restrictive_required_chunker_index), the windows of all other chunkers are identical and kept as a single
+	 * frozen window.
 	 */
 
 public:
@@ -158,90 +457,114 @@ public:
 								int seed,
 								std::list<double> my_thresholds) :
 			thresholds_count(my_thresholds.size()),
-			thresholds((uint32*) malloc(thresholds_count * sizeof(uint32))),
 			least_restrictive_required_chunker_index(0), // initialize optimization code
+			run_byte(0),
+			run_length(0),
+			hashvalue(0),
+			history_head(0),
+			history_level(0),
+			content_position(0),
+			group_count(0),
+			frozen_window(NULL),
+			frozen_offset(0),
+			frozen_hashvalue(0),
 			RabinKarp(my_window_size, seed) {
 		// initialize list of thresholds
-		std::list<double>::iterator iter = my_thresholds.begin();
+		thresholds = new uint32[thresholds_count];
 		int i = 0;
 		for (std::list<double>::iterator iter = my_thresholds.begin(); iter != my_thresholds.end(); ++iter) {
 			thresholds[i] = _compute_threshold(*iter);
 			++i;
 		}
 
-		// initialize a chunker for each threshold
-		threshold_window_levels = new int[thresholds_count];
-		threshold_window_heads = new int[thresholds_count];
-		threshold_content_lengths = new int[thresholds_count];
-		threshold_hashvalues = new uint32[thresholds_count];
-		threshold_windows = new unsigned char*[thresholds_count];
-		for (int threshold_index = 0; threshold_index < thresholds_count; threshold_index++) {
-			threshold_window_levels[threshold_index] = 0;
-			threshold_window_heads[threshold_index] = 0;
-			threshold_content_lengths[threshold_index] = 0;
-			threshold_hashvalues[threshold_index] = 0;
-			threshold_windows[threshold_index] = new unsigned char[window_size];
-		}
+		history = new unsigned char[window_size];
+		reset_positions = new uint64[thresholds_count]();
+		group_ends = new int[thresholds_count];
+		group_prefixes = new const unsigned char*[thresholds_count];
+		group_buffers = new unsigned char*[thresholds_count];
+		group_positions = new int[thresholds_count];
+		group_hashvalues = new uint32[thresholds_count];
+
+		// state of a window consisting of zeros only, i.e., of a chunker reset with at least window_size zeros
+		zero_window = new unsigned char[window_size]();
+		zero_hashvalue = 0;
+		for (int i = 0; i < window_size; ++i)
+			zero_hashvalue = _eat(zero_hashvalue, 0);
 	}
 
 	~RabinKarpMultiThresholdHash() {
-		// clean up threshold-specific chunkers
-		delete[] threshold_window_levels;
-		delete[] threshold_window_heads;
-		delete[] threshold_content_lengths;
-		delete[] threshold_hashvalues;
-		for (int i = 0; i < thresholds_count; i++)
-			delete[] threshold_windows[i];
-		delete[] threshold_windows;
-
-		// clean up thresholds
-		free(thresholds);
+		delete[] thresholds;
+		delete[] history;
+		delete[] reset_positions;
+		delete[] group_ends;
+		delete[] group_prefixes;
+		delete[] group_buffers;
+		delete[] group_positions;
+		delete[] group_hashvalues;
+		delete[] zero_window;
+		for (size_t i = 0; i < buffers.size(); ++i)
+			delete[] buffers[i];
 	}
 
-	std::list<unsigned int> next_chunk_boundaries_with_thresholds(const std::string *content, unsigned int prepend_bytes) {
-		const char* content_str = content->c_str();
-		unsigned int len = content->length();
-
-		// prepend bytes as specified
-		for (int threshold_index = 0; threshold_index < thresholds_count; ++threshold_index)
-			for (unsigned int i = 0; i < prepend_bytes; ++i)
-				_update(0, threshold_hashvalues[threshold_index], threshold_windows[threshold_index],
-						threshold_window_heads[threshold_index], threshold_window_levels[threshold_index]);
+	std::list<uint64> next_chunk_boundaries_with_thresholds(const ByteBuffer *content,
+	                                                              uint64 prepend_bytes) {
+		const char* content_str = content->data;
+		uint64 len = content->length;
+
+		std::list<uint64> boundaries;
+		if (thresholds_count == 0)
+			return (boundaries);
+		const int last = thresholds_count - 1;
+
+		/* prepend bytes as specified; as windows are completely filled with zeros after window_size zero bytes, more
+		 * zero bytes do not have any further effect */
+		const int prepend_zeros = std::min(prepend_bytes, (uint64) window_size);
+		for (int i = 0; i < prepend_zeros; ++i) {
+			_update(0, hashvalue, history, history_head, history_level);
+			_update_groups(0);
+			update_run(0);
+		}
+		if (frozen_window != NULL)
+			_append_zeros(frozen_hashvalue, frozen_window, frozen_offset, prepend_zeros);
 
 		// process content byte by byte
-		std::list<unsigned int> boundaries;
-		for (unsigned int i = 0; i < len; ++i) {
-			// let current byte be processed by each required chunker
-			int new_least_restrictive_required_chunker_index = thresholds_count - 1;
-
-			for (int threshold_index = thresholds_count - 1;
-			        threshold_index >= least_restrictive_required_chunker_index; --threshold_index) {
-				_update(content_str[i], threshold_hashvalues[threshold_index], threshold_windows[threshold_index],
-						threshold_window_heads[threshold_index], threshold_window_levels[threshold_index]);
-				threshold_content_lengths[threshold_index]++;
-				if (threshold_content_lengths[threshold_index] < window_size)
-					new_least_restrictive_required_chunker_index = threshold_index;
+		for (uint64 i = 0; i < len; ++i) {
+			_update(content_str[i], hashvalue, history, history_head, history_level);
+			++content_position;
+			update_run(content_str[i]);
+
+			if (least_restrictive_required_chunker_index != last) {
+				_update_groups(content_str[i]);
+
+				/* content lengths are ordered, i.e., if the least restrictive chunker has processed window_size bytes
+				 * since its last reset, so have all other chunkers */
+				if (_content_length(0) >= window_size) {
+					least_restrictive_required_chunker_index = last;
+					_freeze();
+				}
 			}
-			least_restrictive_required_chunker_index = new_least_restrictive_required_chunker_index;
 
 			/* assuming that thresholds are ordered from least restrictive to most restrictive, determine the most
 			 * restrictive threshold that matches (if any) */
 			int matching_threshold_index = -1;
+			int group = 0;
 			for (int threshold_index = 0; threshold_index < thresholds_count; ++threshold_index) {
 				int used_chunker_index = std::max(threshold_index, least_restrictive_required_chunker_index);
+				while (group < group_count && used_chunker_index >= group_ends[group])
+					++group;
 
 				/* thresholds are processed in this order since the majority of all positions will not match any
 				 * threshold, allowing for an early break which is only possible when starting with the least
 				 * restrictive threshold */
-				if (threshold_window_levels[used_chunker_index] == window_size
-				        && threshold_hashvalues[used_chunker_index] < thresholds[threshold_index]) {
+				if (group < group_count ? group_hashvalues[group] < thresholds[threshold_index]
+				        : history_level == window_size && hashvalue < thresholds[threshold_index]) {
 					/* set matching threshold index, which will probably be overwritten by a higher (i.e., more
 					 * restrictive threshold index in a subsequent iteration) */
 					matching_threshold_index = threshold_index;
 				} else {
 					/* if this threshold did not match and if it does not depend on any prepended zeros, none of the
 					 * more restrictive thresholds will match */
-					if (threshold_content_lengths[used_chunker_index] >= window_size)
+					if (_content_length(used_chunker_index) >= window_size)
 						break;
 				}
 			}
@@ -251,25 +574,22 @@ public:
 				boundaries.push_back(i + 1);
 				boundaries.push_back(matching_threshold_index);
 
-				/* reset chunkers for lower-level nodes (i.e., chunkers with less restrictive thresholds) */
-				for (int j = 0; j < matching_threshold_index; ++j) {
-					for (unsigned int k = 0; k < prepend_bytes; ++k)
-						_update(0, threshold_hashvalues[j], threshold_windows[j], threshold_window_heads[j],
-								threshold_window_levels[j]);
-					threshold_content_lengths[j] = 0;
-				}
-
-				/* some chunkers for nodes lower (i.e., chunkers with less restrictive thresholds) than
-				 * least_restrictive_required_chunker_index are now used again due to the above-described reset, so we
-				 * update their states accordingly */
-				for (int j = matching_threshold_index; j < least_restrictive_required_chunker_index; ++j) {
-					threshold_hashvalues[j] = threshold_hashvalues[least_restrictive_required_chunker_index];
-					std::memcpy(threshold_windows[j], threshold_windows[least_restrictive_required_chunker_index],
-					            window_size);
-					threshold_window_heads[j] = threshold_window_heads[least_restrictive_required_chunker_index];
-					threshold_window_levels[j] = threshold_window_levels[least_restrictive_required_chunker_index];
-				}
+				/* reset chunkers for lower-level nodes (i.e., chunkers with less restrictive thresholds); chunkers
+				 * that were not in use continue with the window of the most restrictive chunker */
+				if (frozen_window != NULL)
+					_thaw(matching_threshold_index, prepend_zeros);
+				else
+					_reset(matching_threshold_index, prepend_zeros);
+				for (int j = 0; j < matching_threshold_index; ++j)
+					reset_positions[j] = content_position;
 				least_restrictive_required_chunker_index = 0;
+			} else if (run_length == window_size
+			        && least_restrictive_required_chunker_index == last
+			        && _content_length(last) >= window_size) {
+				/* only the most restrictive chunker is in use and its window consists of identical bytes only, i.e.,
+				 * its state remains unchanged (and does not match any threshold) until the run of identical bytes
+				 * ends, so we skip the run */
+				i = _find_run_end(content_str, i + 1, len, run_byte) - 1;
 			}
 		}
 
@@ -280,16 +600,251 @@ private:
 	int thresholds_count;
 	uint32* thresholds;
 
-	int* threshold_window_levels;
-	int* threshold_window_heads;
-	int* threshold_content_lengths;
-	uint32* threshold_hashvalues;
-	unsigned char** threshold_windows;
-
 	/* OPTIMIZATION: If a chunker has processed at least window_size bytes of the content, all subsequent (i.e., more
 	 * restrictive threshold) chunkers would have the same state. Thus, we save redundant executions by determining the
 	 * least-restrictive chunker that is still required. */
 	int least_restrictive_required_chunker_index;
+
+	/* number of identical bytes at the end of the window of the most restrictive chunker (which is never reset),
+	 * allowing to skip long runs of identical bytes */
+	unsigned char run_byte;
+	int run_length;
+
+	// state of the most restrictive chunker, whose window is the history buffer
+	uint32 hashvalue;
+	unsigned char* history;
+	int history_head;
+	int history_level;
+
+	// number of content bytes consumed so far, and (for each chunker) at the time of its last reset
+	uint64 content_position;
+	uint64* reset_positions;
+
+	/* groups of chunkers whose windows differ from the history buffer, ordered by chunker index; group g consists of
+	 * the chunkers from group_ends[g - 1] (or 0) to group_ends[g] (exclusive), and its window consists of
+	 * group_prefixes[g][group_positions[g]:window_size] followed by the last group_positions[g] bytes of the history
+	 * buffer */
+	int group_count;
+	int* group_ends;
+	const unsigned char** group_prefixes;
+	unsigned char** group_buffers; // buffers containing the prefixes, or NULL for zero_window
+	int* group_positions;
+	uint32* group_hashvalues;
+
+	// window (frozen_window[frozen_offset:frozen_offset + window_size]) of all chunkers not in use, if any
+	unsigned char* frozen_window;
+	int frozen_offset;
+	uint32 frozen_hashvalue;
+
+	unsigned char* zero_window;
+	uint32 zero_hashvalue;
+
+	/* buffers of 2 * window_size bytes, whose second halves are zeros, so that zeros can be appended to a window
+	 * stored in the first half by moving its beginning */
+	std::vector<unsigned char*> buffers;
+	std::vector<unsigned char*> free_buffers;
+
+	void update_run(unsigned char b) {
+		if (b != run_byte) {
+			run_byte = b;
+			run_length = 1;
+		} else if (run_length != window_size) {
+			run_length += 1;
+		}
+	}
+
+	uint64 _content_length(int chunker_index) {
+		return (content_position - reset_positions[chunker_index]);
+	}
+
+	void _update_groups(unsigned char b) {
+		for (int g = 0; g < group_count; ++g)
+			group_hashvalues[g] = _roll(group_hashvalues[g], b, group_prefixes[g][group_positions[g]++]);
+
+		/* groups that consumed window_size bytes since their reset have the window of the most restrictive chunker;
+		 * as chunkers of lower groups have been reset more recently, these are the highest groups */
+		while (group_count > 0 && group_positions[group_count - 1] == window_size)
+			_release_buffer(group_buffers[--group_count]);
+	}
+
+	void _freeze() {
+		/* only the most restrictive chunker is used from now on; as all chunkers have consumed window_size bytes since
+		 * their last reset, there are no groups */
+		frozen_window = _acquire_buffer();
+		_copy_history(frozen_window, window_size);
+		frozen_offset = 0;
+		frozen_hashvalue = hashvalue;
+	}
+
+	void _thaw(int matching_threshold_index, int zeros) {
+		// chunkers below the matching one are reset, i.e., zeros are appended to the frozen window
+		if (matching_threshold_index > 0) {
+			_append_zeros(frozen_hashvalue, frozen_window, frozen_offset, zeros);
+			group_count = 1;
+			group_ends[0] = matching_threshold_index;
+			group_prefixes[0] = frozen_window + frozen_offset;
+			group_buffers[0] = frozen_window;
+			group_positions[0] = 0;
+			group_hashvalues[0] = frozen_hashvalue;
+		} else {
+			_release_buffer(frozen_window);
+		}
+		frozen_window = NULL;
+	}
+
+	void _reset(int matching_threshold_index, int zeros) {
+		// appends zeros to the windows of all chunkers below the matching one
+		if (matching_threshold_index == 0 || zeros == 0)
+			return;
+
+		if (zeros == window_size) {
+			// all these windows consist of zeros only now, so all these chunkers form a single group
+			int g = 0;
+			while (g < group_count && group_ends[g] <= matching_threshold_index)
+				_release_buffer(group_buffers[g++]);
+			std::memmove(group_ends + 1, group_ends + g, (group_count - g) * sizeof(*group_ends));
+			std::memmove(group_prefixes + 1, group_prefixes + g, (group_count - g) * sizeof(*group_prefixes));
+			std::memmove(group_buffers + 1, group_buffers + g, (group_count - g) * sizeof(*group_buffers));
+			std::memmove(group_positions + 1, group_positions + g, (group_count - g) * sizeof(*group_positions));
+			std::memmove(group_hashvalues + 1, group_hashvalues + g, (group_count - g) * sizeof(*group_hashvalues));
+			group_count -= g - 1;
+			group_ends[0] = matching_threshold_index;
+			group_prefixes[0] = zero_window;
+			group_buffers[0] = NULL;
+			group_positions[0] = 0;
+			group_hashvalues[0] = zero_hashvalue;
+			return;
+		}
+
+		// otherwise, the windows of the affected groups are materialized before zeros are appended
+		for (int g = 0; g < group_count && (g == 0 || group_ends[g - 1] < matching_threshold_index); ++g) {
+			if (group_ends[g] > matching_threshold_index) {
+				// the group is split, its lower part gets a copy of its window
+				_insert_group(g);
+				group_ends[g] = matching_threshold_index;
+				group_buffers[g] = NULL;
+			}
+			unsigned char* buffer = group_buffers[g] != NULL ? group_buffers[g] : _acquire_buffer();
+			std::memmove(buffer, group_prefixes[g] + group_positions[g], window_size - group_positions[g]);
+			_copy_history(buffer + window_size - group_positions[g], group_positions[g]);
+			_reset_group(g, buffer, group_hashvalues[g], zeros);
+		}
+
+		// chunkers having the window of the most restrictive chunker form a new group
+		const int group_begin = group_count > 0 ? group_ends[group_count - 1] : 0;
+		if (group_begin < matching_threshold_index) {
+			unsigned char* buffer = _acquire_buffer();
+			_copy_history(buffer, window_size);
+			group_ends[group_count] = matching_threshold_index;
+			_reset_group(group_count++, buffer, hashvalue, zeros);
+		}
+	}
+
+	void _insert_group(int g) {
+		// inserts a copy of group g before it
+		for (int k = group_count; k > g; --k) {
+			group_ends[k] = group_ends[k - 1];
+			group_prefixes[k] = group_prefixes[k - 1];
+			group_buffers[k] = group_buffers[k - 1];
+			group_positions[k] = group_positions[k - 1];
+			group_hashvalues[k] = group_hashvalues[k - 1];
+		}
+		++group_count;
+	}
+
+	void _reset_group(int g, unsigned char* window, uint32 window_hashvalue, int zeros) {
+		// sets the prefix of group g to the given (materialized) window with zeros appended
+		int offset = 0;
+		_append_zeros(window_hashvalue, window, offset, zeros);
+		group_prefixes[g] = window + offset;
+		group_buffers[g] = window;
+		group_positions[g] = 0;
+		group_hashvalues[g] = window_hashvalue;
+	}
+
+	void _append_zeros(uint32 &window_hashvalue, const unsigned char* window, int &offset, int zeros) {
+		/* appends zeros to the window window[offset:offset + window_size] (which is followed by zeros) by moving its
+		 * beginning */
+		for (int k = 0; k < zeros && offset < window_size; ++k)
+			window_hashvalue = _roll(window_hashvalue, 0, window[offset++]);
+	}
+
+	void _copy_history(unsigned char* dest, int count) {
+		// copies the last count bytes of the history buffer to dest
+		const int begin = (history_head - count + window_size) % window_size;
+		if (begin + count <= window_size) {
+			std::memcpy(dest, history + begin, count);
+		} else {
+			std::memcpy(dest, history + begin, window_size - begin);
+			std::memcpy(dest + window_size - begin, history, count - (window_size - begin));
+		}
+	}
+
+	unsigned char* _acquire_buffer() {
+		if (free_buffers.empty()) {
+			buffers.push_back(new unsigned char[2 * window_size]());
+			return (buffers.back());
+		}
+		unsigned char* buffer = free_buffers.back();
+		free_buffers.pop_back();
+		return (buffer);
+	}
+
+	void _release_buffer(unsigned char* buffer) {
+		if (buffer != NULL)
+			free_buffers.push_back(buffer);
+	}
+};
+
+class RabinKarpHashGroup {
+	/* Performs chunking with several independent RabinKarpHash chunkers (e.g., using different window sizes, seeds or
+	 * thresholds) in a single pass over the content.
+	 *
+	 * The content is processed in blocks small enough to remain in the CPU cache while all chunkers process them, so
+	 * that the content has to be loaded from memory only once.
+	 */
+public:
+	RabinKarpHashGroup(std::list<int> window_sizes, std::list<int> seeds, std::list<double> thresholds) {
+		std::list<int>::iterator window_size = window_sizes.begin();
+		std::list<int>::iterator seed = seeds.begin();
+		std::list<double>::iterator threshold = thresholds.begin();
+		for (; window_size != window_sizes.end(); ++window_size, ++seed, ++threshold) {
+			RabinKarpHash* hash = new RabinKarpHash(*window_size, *seed);
+			hash->set_threshold(*threshold);
+			hashes.push_back(hash);
+		}
+	}
+
+	~RabinKarpHashGroup() {
+		for (size_t i = 0; i < hashes.size(); ++i)
+			delete hashes[i];
+	}
+
+	std::list<uint64> next_chunk_boundaries(const ByteBuffer *str, const uint64 prepend_bytes) {
+		/* Same as RabinKarpHash::next_chunk_boundaries, but for all chunkers of the group. Each chunk boundary is
+		 * followed by the index of the chunker that found it. */
+		std::list<uint64> results;
+		uint64 offset = 0;
+		do {
+			ByteBuffer block = {str->data + offset, std::min(str->length - offset, BLOCK_SIZE)};
+			for (size_t i = 0; i < hashes.size(); ++i) {
+				std::list<uint64> boundaries = hashes[i]->next_chunk_boundaries(&block,
+				                                                                      offset == 0 ? prepend_bytes : 0);
+				for (std::list<uint64>::iterator boundary = boundaries.begin(); boundary != boundaries.end();
+				        ++boundary) {
+					results.push_back(offset + *boundary);
+					results.push_back(i);
+				}
+			}
+			offset += block.length;
+		} while (offset < str->length);
+		return (results);
+	}
+
+private:
+	std::vector<RabinKarpHash*> hashes;
+
+	static const uint64 BLOCK_SIZE = 64 * 1024;
 };
 
 #endif
@@ -1,11 +1,38 @@
 import pybindgen
+from pybindgen.typehandlers.base import ForwardWrapperBase, Parameter
+
+
+class ByteBufferParam(Parameter):
+    """Passes a Python object supporting the buffer protocol (e.g., bytes, bytearray, memoryview or mmap) as
+    `const ByteBuffer*` to C++ without copying its content."""
+
+    DIRECTIONS = [Parameter.DIRECTION_IN]
+    CTYPES = []
+
+    def convert_c_to_python(self, wrapper):
+        raise NotImplementedError
+
+    def convert_python_to_c(self, wrapper):
+        assert isinstance(wrapper, ForwardWrapperBase)
+        py_buffer = wrapper.declarations.declare_variable('Py_buffer', self.name + '_buffer')
+        name = wrapper.declarations.declare_variable('ByteBuffer', self.name)
+        wrapper.parse_params.add_parameter('y*', ['&' + py_buffer], self.name)
+        wrapper.before_call.add_cleanup_code('PyBuffer_Release(&%s);' % py_buffer)
+        wrapper.before_call.write_code('%s.data = (const char*) %s.buf;' % (name, py_buffer))
+        wrapper.before_call.write_code('%s.length = (uint64) %s.len;' % (name, py_buffer))
+        wrapper.call_params.append('&' + name)
 
 
 def generate(file_):
     mod = pybindgen.Module('_rabinkarprh')
     mod.add_include('"rabinkarp.h"')
-    mod.add_container('std::list<unsigned int>', 'unsigned int', 'list')
+    mod.add_include('"extremum.h"')
+    mod.add_container('std::list<unsigned long long>', 'unsigned long long', 'list')
     mod.add_container('std::list<double>', 'double', 'list')
+    mod.add_container('std::list<int>', 'int', 'list')
+
+    # methods processing content release the GIL (unblock_threads), so that other threads can run concurrently, e.g.,
+    # to read further content
 
     cls = mod.add_class('RabinKarpHash')
     cls.add_constructor([pybindgen.param('int', 'my_window_size'),
@@ -14,17 +41,63 @@ def generate(file_):
                    None,
                    [pybindgen.param('double', 'my_threshold')])
     cls.add_method('next_chunk_boundaries',
-                   pybindgen.retval('std::list<unsigned int>'),
-                   [pybindgen.param('const std::string*', 'content'),
-                    pybindgen.param('const unsigned int', 'prepend_bytes')])
+                   pybindgen.retval('std::list<unsigned long long>'),
+                   [ByteBufferParam('const ByteBuffer*', 'content'),
+                    pybindgen.param('const unsigned long long', 'prepend_bytes')],
+                   unblock_threads=True)
+    cls.add_method('set_delimiter',
+                   None,
+                   [pybindgen.param('int', 'my_delimiter'),
+                    pybindgen.param('unsigned long long', 'my_max_chunk_size')])
+    cls.add_method('set_features',
+                   None,
+                   [pybindgen.param('int', 'my_super_feature_count'),
+                    pybindgen.param('int', 'my_features_per_super_feature')])
+    cls.add_method('next_chunk_boundaries_with_features',
+                   pybindgen.retval('std::list<unsigned long long>'),
+                   [ByteBufferParam('const ByteBuffer*', 'content'),
+                    pybindgen.param('const unsigned long long', 'prepend_bytes')],
+                   unblock_threads=True)
+    cls.add_method('next_chunk_boundaries_zeros',
+                   pybindgen.retval('std::list<unsigned long long>'),
+                   [pybindgen.param('const unsigned long long', 'count')],
+                   unblock_threads=True)
+    cls.add_method('next_chunk_boundary',
+                   pybindgen.retval('long long'),
+                   [ByteBufferParam('const ByteBuffer*', 'content')],
+                   unblock_threads=True)
 
     cls = mod.add_class('RabinKarpMultiThresholdHash')
     cls.add_constructor([pybindgen.param('int', 'my_window_size'),
                          pybindgen.param('int', 'seed'),
                          pybindgen.param('std::list<double>', 'my_thresholds')])
     cls.add_method('next_chunk_boundaries_with_thresholds',
-                   pybindgen.retval('std::list<unsigned int>'),
-                   [pybindgen.param('const std::string*', 'content'),
-                    pybindgen.param('unsigned int', 'prepend_bytes')])
+                   pybindgen.retval('std::list<unsigned long long>'),
+                   [ByteBufferParam('const ByteBuffer*', 'content'),
+                    pybindgen.param('unsigned long long', 'prepend_bytes')],
+                   unblock_threads=True)
+
+    cls = mod.add_class('RabinKarpHashGroup')
+    cls.add_constructor([pybindgen.param('std::list<int>', 'window_sizes'),
+                         pybindgen.param('std::list<int>', 'seeds'),
+                         pybindgen.param('std::list<double>', 'thresholds')])
+    cls.add_method('next_chunk_boundaries',
+                   pybindgen.retval('std::list<unsigned long long>'),
+                   [ByteBufferParam('const ByteBuffer*', 'content'),
+                    pybindgen.param('const unsigned long long', 'prepend_bytes')],
+                   unblock_threads=True)
+
+    for class_name in ('AsymmetricExtremum', 'RapidAsymmetricMaximum'):
+        cls = mod.add_class(class_name)
+        cls.add_constructor([pybindgen.param('int', 'my_window_size')])
+        cls.add_method('next_chunk_boundaries',
+                       pybindgen.retval('std::list<unsigned long long>'),
+                       [ByteBufferParam('const ByteBuffer*', 'content'),
+                        pybindgen.param('const unsigned long long', 'prepend_bytes')],
+                       unblock_threads=True)
+        cls.add_method('next_chunk_boundary',
+                       pybindgen.retval('long long'),
+                       [ByteBufferParam('const ByteBuffer*', 'content')],
+                       unblock_threads=True)
 
     mod.generate(file_)
@@ -95,11 +95,14 @@ setup(
 
     setup_requires=['pybindgen'],
     install_requires=['pybindgen'],
+    extras_require={'numpy': ['numpy']},
 
     ext_modules=[
         Extension('fastchunking._rabinkarprh',
                   sources=[module_fname, 'lib/rabinkarp.cpp'],
-                  include_dirs=['lib']
+                  include_dirs=['lib'],
+                  # fall back to the NumPy implementation if the extension cannot be built
+                  optional=True
                   )
     ],
 